@@ -23,6 +23,13 @@ except ImportError as e:
     st.warning(f"LangChain Agent機能が利用できません: {e}")
     LANGCHAIN_AGENT_AVAILABLE = False
 
+# エージェント用システムプロンプトのパス
+AGENT_PROMPT_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "prompts",
+    "agent_system_prompt.txt"
+)
+
 
 class StreamlitAgentCallbackHandler(BaseCallbackHandler):
     """Streamlitでのエージェント実行過程を可視化するコールバックハンドラー"""
@@ -197,12 +204,8 @@ class AWSAgentExecutor:
     def _load_agent_prompt(self) -> PromptTemplate:
         """エージェント用プロンプトテンプレートを読み込み"""
         try:
-            # プロンプトファイルパス
-            current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            prompt_path = os.path.join(current_dir, "prompts", "agent_system_prompt.txt")
-            
-            if os.path.exists(prompt_path):
-                with open(prompt_path, 'r', encoding='utf-8') as f:
+            if os.path.exists(AGENT_PROMPT_FILE):
+                with open(AGENT_PROMPT_FILE, 'r', encoding='utf-8') as f:
                     template = f.read()
             else:
                 # デフォルトプロンプト
@@ -4,6 +4,7 @@ import logging
 import os
 import re
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 
 # Page type constants
@@ -11,6 +12,16 @@ PAGE_TYPE_AWS_CHAT = "aws_chat"
 PAGE_TYPE_TERRAFORM_GENERATOR = "terraform_generator" 
 PAGE_TYPE_GENERAL = "general"
 
+# ページタイプ別の特化ツール（未登録のページタイプは全ツールを使用）
+_PAGE_TOOLS = {
+    PAGE_TYPE_AWS_CHAT: ("aws_cost_analysis",),
+    PAGE_TYPE_TERRAFORM_GENERATOR: ("terraform_code_generator",),
+}
+_DEFAULT_PAGE_TOOLS = ("aws_cost_analysis", "terraform_code_generator")
+
+# コスト分析でサービス別見積もりを並列取得する際の最大スレッド数
+_MAX_COST_ESTIMATE_WORKERS = 8
+
 # テンプレートキャッシュ（モジュールレベル）
 _COST_ANALYSIS_TEMPLATE = None
 
@@ -276,29 +287,43 @@ class LangChainMCPManager:
                     successful_estimates = 0
                     failed_estimates = 0
                     
+                    requirements_lower = service_requirements.lower()
+                    service_configs = {}
                     for service in aws_services:
-                        try:
-                            logging.info(f"🔄 エージェントツール: {service}のコスト分析開始")
-                            
-                            # サービス構成情報を準備
-                            service_config = {
-                                "service_name": service,
-                                "region": "us-east-1",  # デフォルトリージョン
-                                "usage_details": {}
-                            }
-                            
-                            # 要件文字列からインスタンスタイプを推定
-                            if service in ["EC2", "RDS"]:
-                                if "small" in service_requirements.lower():
-                                    service_config["instance_type"] = "t3.small" if service == "EC2" else "db.t3.small"
-                                elif "large" in service_requirements.lower():
-                                    service_config["instance_type"] = "t3.large" if service == "EC2" else "db.t3.large"
-                                else:
-                                    service_config["instance_type"] = "t3.medium" if service == "EC2" else "db.t3.small"
-                            
-                            # MCPクライアントからコスト見積もりを取得
+                        logging.info(f"🔄 エージェントツール: {service}のコスト分析開始")
+                        
+                        # サービス構成情報を準備
+                        service_config = {
+                            "service_name": service,
+                            "region": "us-east-1",  # デフォルトリージョン
+                            "usage_details": {}
+                        }
+                        
+                        # 要件文字列からインスタンスタイプを推定
+                        if service in ["EC2", "RDS"]:
+                            if "small" in requirements_lower:
+                                service_config["instance_type"] = "t3.small" if service == "EC2" else "db.t3.small"
+                            elif "large" in requirements_lower:
+                                service_config["instance_type"] = "t3.large" if service == "EC2" else "db.t3.large"
+                            else:
+                                service_config["instance_type"] = "t3.medium" if service == "EC2" else "db.t3.small"
+                        
+                        service_configs[service] = service_config
+                    
+                    # MCPクライアントからコスト見積もりを取得（ネットワーク待ちが主体のため並列実行）
+                    with ThreadPoolExecutor(
+                        max_workers=min(len(service_configs), _MAX_COST_ESTIMATE_WORKERS)
+                    ) as executor:
+                        estimate_futures = {}
+                        for service, service_config in service_configs.items():
                             logging.info(f"📞 MCPクライアント呼び出し: {service} -> {service_config}")
-                            estimate = mcp_client_service.get_cost_estimation(service_config)
+                            estimate_futures[service] = executor.submit(
+                                mcp_client_service.get_cost_estimation, service_config
+                            )
+                    
+                    for service in aws_services:
+                        try:
+                            estimate = estimate_futures[service].result()
                             
                             if estimate:
                                 cost = estimate.get('cost', 'N/A')
@@ -351,10 +376,6 @@ class LangChainMCPManager:
                     successful_services = sum(1 for status in analysis_steps["cost_estimates"].values() 
                                             if status == "success")
                     
-                    print(f"   🎯 コスト分析完了統計:")
-                    print(f"     - 完了ステップ: {completed_steps}/4")
-                    print(f"     - 成功したサービス: {successful_services}/{len(aws_services)}")
-                    print(f"     - 最終レポート: {'生成成功' if result and not result.startswith('コスト分析レポートの生成に失敗') else '生成失敗'}")
                     logging.info(f"🎯 コスト分析完了統計:")
                     logging.info(f"   - 完了ステップ: {completed_steps}/4")
                     logging.info(f"   - 成功したサービス: {successful_services}/{len(aws_services)}")
@@ -390,38 +411,22 @@ class LangChainMCPManager:
                 func=core_guidance
             ))
             
-            # ページ特化ツールを追加
-            if page_type == PAGE_TYPE_AWS_CHAT:
-                # aws_chatページ: コスト分析に特化
-                tools.append(Tool(
-                    name="aws_cost_analysis",
-                    description="AWS構成のコスト分析と最適化提案を行います。引数: service_requirements (対象サービスと要件)",
-                    func=cost_analysis
-                ))
-                logging.info("aws_chatページ特化: コスト分析ツールを追加")
-                
-            elif page_type == PAGE_TYPE_TERRAFORM_GENERATOR:
-                # terraform_generatorページ: Terraformコード生成に特化
-                tools.append(Tool(
-                    name="terraform_code_generator",
-                    description="AWS構成のTerraformコードを生成します。引数: requirements (実装要件)",
-                    func=terraform_code_generator
-                ))
-                logging.info("terraform_generatorページ特化: Terraformコード生成ツールを追加")
-                
-            else:
-                # 汎用ページ: 全ツールを追加
-                tools.append(Tool(
-                    name="aws_cost_analysis",
-                    description="AWS構成のコスト分析と最適化提案を行います。引数: service_requirements (対象サービスと要件)",
-                    func=cost_analysis
-                ))
-                tools.append(Tool(
-                    name="terraform_code_generator",
-                    description="AWS構成のTerraformコードを生成します。引数: requirements (実装要件)",
-                    func=terraform_code_generator
-                ))
-                logging.info("汎用ページ: 全ツールを追加")
+            # ページ特化ツールを追加（aws_chat: コスト分析, terraform_generator: コード生成, 汎用: 全ツール）
+            page_tool_specs = {
+                "aws_cost_analysis": (
+                    "AWS構成のコスト分析と最適化提案を行います。引数: service_requirements (対象サービスと要件)",
+                    cost_analysis
+                ),
+                "terraform_code_generator": (
+                    "AWS構成のTerraformコードを生成します。引数: requirements (実装要件)",
+                    terraform_code_generator
+                ),
+            }
+            page_tool_names = _PAGE_TOOLS.get(page_type, _DEFAULT_PAGE_TOOLS)
+            for tool_name in page_tool_names:
+                description, func = page_tool_specs[tool_name]
+                tools.append(Tool(name=tool_name, description=description, func=func))
+            logging.info(f"ページ特化ツールを追加: {', '.join(page_tool_names)} (ページタイプ: {page_type})")
             
             logging.info(f"MCPClientService統合ツール作成完了: {len(tools)}個 (ページタイプ: {page_type})")
             
@@ -58,6 +58,7 @@ class StreamlitMemoryManager:
         if "messages" not in st.session_state:
             st.session_state["messages"] = []
         st.session_state["messages"].append({"role": "assistant", "content": message})
+        st.session_state["_last_assistant_content"] = message
     
     def get_chat_history(self) -> List[Dict[str, str]]:
         """チャット履歴を取得"""
@@ -74,8 +75,8 @@ class StreamlitMemoryManager:
             
             return history
         else:
-            # Streamlitセッション状態から取得
-            return st.session_state.get("messages", [])
+            # Streamlitセッション状態から取得（上限付きdequeの場合もリストで返す）
+            return list(st.session_state.get("messages", []))
     
     def get_memory_variables(self) -> Dict[str, Any]:
         """メモリ変数を取得"""
@@ -88,9 +89,10 @@ class StreamlitMemoryManager:
         if self.memory_available:
             self.memory.clear()
         
-        # Streamlitセッション状態もクリア
+        # Streamlitセッション状態もクリア（上限付きdequeを保つためその場でクリア）
         if "messages" in st.session_state:
-            st.session_state["messages"] = []
+            st.session_state["messages"].clear()
+        st.session_state["_last_assistant_content"] = ""
     
     def get_recent_messages(self, n: int = 5) -> List[Dict[str, str]]:
         """最近のn件のメッセージを取得"""
@@ -1,5 +1,6 @@
 import streamlit as st
 import os
+import re
 import sys
 import logging
 
@@ -20,7 +21,8 @@ try:
         display_langchain_stats,
         display_memory_stats,
         display_settings_tab,
-        add_message_to_history
+        add_message_to_history,
+        stream_to_placeholder
     )
     from services.bedrock_service import BedrockService
     from services.mcp_client import get_mcp_client
@@ -32,6 +34,20 @@ except ImportError as e:
 
 # ページ設定はメインのapp.pyで設定済み
 
+# プロンプトからのAWSサービスキーワード抽出（簡易版）
+_AWS_SERVICES = ("EC2", "S3", "RDS", "Lambda", "CloudFront", "VPC", "IAM",
+                 "CloudWatch", "ELB", "Auto Scaling", "DynamoDB", "SNS", "SQS")
+# 先読みで重なり合う一致も拾い、プロンプトを1回の走査で判定する
+_AWS_SERVICE_RE = re.compile(
+    "(?=(" + "|".join(map(re.escape, _AWS_SERVICES)) + "))", re.IGNORECASE
+)
+
+
+def _extract_aws_keywords(text: str) -> list:
+    """テキストに含まれるAWSサービス名を定義順で返す"""
+    found = {match.group(1).lower() for match in _AWS_SERVICE_RE.finditer(text)}
+    return [service for service in _AWS_SERVICES if service.lower() in found]
+
 st.title("💬 AWS構成提案チャット")
 
 # セッション状態を初期化
@@ -230,11 +246,7 @@ with tab_chat:
         with col2:
             if st.button("🔧 この構成でTerraformコード生成", use_container_width=True, type="primary"):
                 # 最新のAI応答を共有データとして保存
-                latest_assistant_message = None
-                for message in reversed(st.session_state.messages):
-                    if message["role"] == "assistant":
-                        latest_assistant_message = message["content"]
-                        break
+                latest_assistant_message = st.session_state.get("_last_assistant_content")
                 
                 if latest_assistant_message:
                     # 共有セッション状態に保存
@@ -293,12 +305,7 @@ with tab_chat:
                                 
                                 # AWS Documentation から関連情報を取得
                                 # キーワード抽出（簡易版）
-                                aws_keywords = []
-                                aws_services = ["EC2", "S3", "RDS", "Lambda", "CloudFront", "VPC", "IAM", 
-                                              "CloudWatch", "ELB", "Auto Scaling", "DynamoDB", "SNS", "SQS"]
-                                for service in aws_services:
-                                    if service.lower() in prompt.lower():
-                                        aws_keywords.append(service)
+                                aws_keywords = _extract_aws_keywords(prompt)
                                 
                                 aws_docs = None
                                 if aws_keywords:
@@ -338,16 +345,15 @@ with tab_chat:
                     enable_cache = st.session_state.get("enable_cache", True)
                     use_langchain = st.session_state.get("use_langchain", True)
 
-                    # BedrockServiceを使用してストリーミング応答を取得
-                    for chunk in bedrock_service.invoke_streaming(
-                        prompt=enhanced_prompt,
-                        enable_cache=enable_cache,
-                        use_langchain=use_langchain
-                    ):
-                        full_response += chunk
-                        message_placeholder.write(full_response + "▌")  # カーソル表示
-
-                    message_placeholder.write(full_response)  # 最終的な応答を表示
+                    # BedrockServiceを使用してストリーミング応答を取得（カーソル付きで逐次表示）
+                    full_response = stream_to_placeholder(
+                        message_placeholder,
+                        bedrock_service.invoke_streaming(
+                            prompt=enhanced_prompt,
+                            enable_cache=enable_cache,
+                            use_langchain=use_langchain
+                        )
+                    )
 
         # AIの応答を履歴に追加
         add_message_to_history("assistant", full_response)
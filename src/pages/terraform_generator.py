@@ -11,7 +11,7 @@ if parent_dir not in sys.path:
 try:
     from services.bedrock_service import BedrockService
     from services.mcp_client import get_mcp_client
-    from ui.streamlit_ui import display_chat_history
+    from ui.streamlit_ui import display_chat_history, stream_to_placeholder, migrate_session_state
     from langchain_integration.agent_executor import create_aws_agent_executor
     from langchain_integration.mcp_tools import LangChainMCPManager, PAGE_TYPE_TERRAFORM_GENERATOR
 except ImportError as e:
@@ -45,6 +45,13 @@ def init_bedrock_service():
 
 bedrock_service = init_bedrock_service()
 
+
+@st.cache_resource
+def load_terraform_system_prompt() -> str:
+    """Terraformシステムプロンプトを読み込み（ファイルが無い場合は例外を送出しキャッシュしない）"""
+    with open(TERRAFORM_PROMPT_FILE, "r", encoding="utf-8") as f:
+        return f.read()
+
 # MCPクライアントを初期化
 mcp_client = get_mcp_client()
 
@@ -156,8 +163,7 @@ with st.sidebar:
     st.header("🤖 AI エージェントモード")
     
     # 既存設定の移行処理: enable_terraform_agent_mode -> enable_agent_mode
-    if "enable_terraform_agent_mode" in st.session_state and "enable_agent_mode" not in st.session_state:
-        st.session_state.enable_agent_mode = st.session_state.enable_terraform_agent_mode
+    migrate_session_state(st.session_state)
     
     # エージェントモードの有効/無効
     enable_agent_mode = st.toggle(
@@ -358,8 +364,7 @@ with col1:
 
                         # Terraformシステムプロンプトを読み込み
                         try:
-                            with open(TERRAFORM_PROMPT_FILE, "r", encoding="utf-8") as f:
-                                terraform_system_prompt = f.read()
+                            terraform_system_prompt = load_terraform_system_prompt()
                         except FileNotFoundError:
                             terraform_system_prompt = "あなたはTerraformエキスパートです。AWSのTerraformコードを生成してください。"
 
@@ -452,16 +457,14 @@ MCPサーバーが提供した情報を基に、さらに詳細で実用的な
                         # BedrockServiceのシステムプロンプトを一時的に上書き
                         with bedrock_service.override_system_prompt(terraform_system_prompt):
                             # BedrockServiceを使用してストリーミング応答を取得
-                            for chunk in bedrock_service.invoke_streaming(
-                                prompt=enhanced_context,
-                                enable_cache=enable_cache,
-                                use_langchain=use_langchain
-                            ):
-                                full_response += chunk
-                                message_placeholder.write(full_response + "▌")
-
-                            # 最終応答を表示
-                            message_placeholder.write(full_response)
+                            full_response = stream_to_placeholder(
+                                message_placeholder,
+                                bedrock_service.invoke_streaming(
+                                    prompt=enhanced_context,
+                                    enable_cache=enable_cache,
+                                    use_langchain=use_langchain
+                                )
+                            )
 
                         # キャッシュヒット統計（簡易推定）
                         if enable_cache and st.session_state.terraform_cache_stats["total_requests"] > 1:
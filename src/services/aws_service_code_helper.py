@@ -8,10 +8,70 @@ Cost Analysis MCPとの統合において適切なサービスコードを使用
 import requests
 import json
 import logging
-from typing import List, Dict, Optional
+import functools
+import threading
+from types import MappingProxyType
+from typing import List, Dict, Mapping, Optional
 from datetime import datetime, timedelta
 
 
+# サービス名検索結果のメモの上限件数（入力ごとにキーが増えるため上限を設ける）
+_LOOKUP_MEMO_SIZE = 256
+
+# サービスの別名・略称マッピング（別名 -> service_codesのキー、共有されるため読み取り専用）
+_SERVICE_ALIASES = MappingProxyType({
+    # コンピューティング
+    "ec2": "amazon ec2",
+    "lambda": "aws lambda",
+    "lightsail": "amazon lightsail",
+    "ecs": "amazon ecs",
+    "eks": "amazon eks",
+    "fargate": "amazon ecs",  # Fargateは実際にはECSの一部
+    
+    # ストレージ
+    "s3": "amazon s3",
+    "simple storage service": "amazon s3",
+    "efs": "amazon efs",
+    "fsx": "amazon fsx",
+    "ebs": "amazon ec2",  # EBSはEC2サービスに含まれる
+    "elastic block store": "amazon ec2",
+    
+    # データベース
+    "rds": "amazon rds",
+    "relational database service": "amazon rds",
+    "dynamo": "amazon dynamodb",
+    "dynamodb": "amazon dynamodb",
+    "redshift": "amazon redshift",
+    "elasticache": "amazon elasticache",
+    
+    # AI・機械学習
+    "bedrock": "amazon bedrock",
+    "sagemaker": "amazon sagemaker",
+    "rekognition": "amazon rekognition",
+    "comprehend": "amazon comprehend",
+    
+    # ネットワーキング
+    "cloudfront": "amazon cloudfront",
+    "cdn": "amazon cloudfront",
+    "route53": "amazon route 53",
+    "route 53": "amazon route 53",
+    "dns": "amazon route 53",
+    "vpc": "amazon vpc",
+    "elb": "elastic load balancing",
+    "load balancer": "elastic load balancing",
+    "alb": "elastic load balancing",
+    "nlb": "elastic load balancing",
+    
+    # その他
+    "sns": "amazon sns",
+    "sqs": "amazon sqs",
+    "cloudwatch": "amazon cloudwatch",
+    "iam": "aws iam",
+    "config": "aws config",
+    "cloudtrail": "aws cloudtrail"
+})
+
+
 class AWSServiceCodeHelper:
     """AWSサービスコードの取得と検索を行うヘルパークラス"""
     
@@ -25,6 +85,8 @@ class AWSServiceCodeHelper:
         self.service_codes = None
         self.cache_duration = cache_duration
         self.last_updated = None
+        # 正規化済みサービス名 -> 検索結果 のメモ（サービスコード再読み込み時にクリア）
+        self._lookup_memo = functools.lru_cache(maxsize=_LOOKUP_MEMO_SIZE)(self._resolve_service_code)
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.INFO)  # INFOレベル以上のログを表示
         self.logger.info("AWSServiceCodeHelper初期化開始")
@@ -48,6 +110,7 @@ class AWSServiceCodeHelper:
             
             data = response.json()
             self.service_codes = {}
+            self._lookup_memo.cache_clear()
             
             processed_count = 0
             for offer in data.get('offers', {}).values():
@@ -82,6 +145,7 @@ class AWSServiceCodeHelper:
     def _load_fallback_codes(self):
         """フォールバック用の主要サービスコード"""
         self.logger.info("フォールバックサービスコード読み込み開始")
+        self._lookup_memo.cache_clear()
         self.service_codes = {
             # コンピューティング
             "amazon ec2": "AmazonEC2",
@@ -148,6 +212,19 @@ class AWSServiceCodeHelper:
         service_name = service_name.lower().strip()
         self.logger.debug(f"正規化済みサービス名: '{service_name}'")
         
+        # 同じ名前の検索結果はメモから返す（部分一致の全件走査を繰り返さない）
+        return self._lookup_memo(service_name)
+    
+    def _resolve_service_code(self, service_name: str) -> Optional[str]:
+        """
+        正規化済みサービス名からサービスコードを解決
+        
+        Args:
+            service_name: 小文字化・前後空白除去済みのサービス名
+            
+        Returns:
+            サービスコード、見つからない場合はNone
+        """
         # 完全一致チェック
         if service_name in self.service_codes:
             result = self.service_codes[service_name]
@@ -172,59 +249,9 @@ class AWSServiceCodeHelper:
         self.logger.warning(f"サービスコード見つからず: '{service_name}'")
         return None
     
-    def _get_service_aliases(self) -> Dict[str, str]:
+    def _get_service_aliases(self) -> Mapping[str, str]:
         """サービスの別名・略称マッピング"""
-        return {
-            # コンピューティング
-            "ec2": "amazon ec2",
-            "lambda": "aws lambda",
-            "lightsail": "amazon lightsail",
-            "ecs": "amazon ecs",
-            "eks": "amazon eks",
-            "fargate": "amazon ecs",  # Fargateは実際にはECSの一部
-            
-            # ストレージ
-            "s3": "amazon s3",
-            "simple storage service": "amazon s3",
-            "efs": "amazon efs",
-            "fsx": "amazon fsx",
-            "ebs": "amazon ec2",  # EBSはEC2サービスに含まれる
-            "elastic block store": "amazon ec2",
-            
-            # データベース
-            "rds": "amazon rds",
-            "relational database service": "amazon rds",
-            "dynamo": "amazon dynamodb",
-            "dynamodb": "amazon dynamodb",
-            "redshift": "amazon redshift",
-            "elasticache": "amazon elasticache",
-            
-            # AI・機械学習
-            "bedrock": "amazon bedrock",
-            "sagemaker": "amazon sagemaker",
-            "rekognition": "amazon rekognition",
-            "comprehend": "amazon comprehend",
-            
-            # ネットワーキング
-            "cloudfront": "amazon cloudfront",
-            "cdn": "amazon cloudfront",
-            "route53": "amazon route 53",
-            "route 53": "amazon route 53",
-            "dns": "amazon route 53",
-            "vpc": "amazon vpc",
-            "elb": "elastic load balancing",
-            "load balancer": "elastic load balancing",
-            "alb": "elastic load balancing",
-            "nlb": "elastic load balancing",
-            
-            # その他
-            "sns": "amazon sns",
-            "sqs": "amazon sqs",
-            "cloudwatch": "amazon cloudwatch",
-            "iam": "aws iam",
-            "config": "aws config",
-            "cloudtrail": "aws cloudtrail"
-        }
+        return _SERVICE_ALIASES
     
     def search_services(self, keyword: str) -> List[Dict[str, str]]:
         """
@@ -275,6 +302,7 @@ class AWSServiceCodeHelper:
         """
         self.last_updated = None
         self.service_codes = None
+        self._lookup_memo.cache_clear()
         
         try:
             self._load_service_codes()
@@ -331,6 +359,8 @@ class AWSServiceCodeHelper:
 
 # グローバルインスタンス（シングルトンパターン）
 _service_code_helper = None
+# コスト見積もりの並列スレッドから同時に初期化されないよう生成を直列化するロック
+_service_code_helper_lock = threading.Lock()
 
 def get_service_code_helper() -> AWSServiceCodeHelper:
     """
@@ -342,7 +372,10 @@ def get_service_code_helper() -> AWSServiceCodeHelper:
     global _service_code_helper
     
     if _service_code_helper is None:
-        _service_code_helper = AWSServiceCodeHelper()
+        with _service_code_helper_lock:
+            # ロック待ちの間に他スレッドが生成済みの場合は再利用する
+            if _service_code_helper is None:
+                _service_code_helper = AWSServiceCodeHelper()
     
     return _service_code_helper
 
@@ -111,7 +111,7 @@ class BedrockService:
             if self.memory_manager and self.memory_manager.is_available():
                 chat_history = self.memory_manager.get_chat_history()[:-1]
             elif "messages" in st.session_state:
-                chat_history = st.session_state.get("messages", [])[:-1]
+                chat_history = list(st.session_state.get("messages", []))[:-1]
             
             # LangChainでストリーミング実行
             for chunk in self.langchain_llm.invoke_with_memory(prompt, self.system_prompt, chat_history):
@@ -5,12 +5,20 @@ AWS MCP (Model Context Protocol) クライアントサービス
 Windows、Mac、Linux環境での動作をサポートします。
 """
 
+import atexit
 import json
 import os
 import platform
+import re
+import shelve
 import subprocess
+import functools
+import threading
+from collections import OrderedDict
+from itertools import islice
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 import logging
 import hashlib
 import time
@@ -19,6 +27,13 @@ from datetime import datetime, timedelta
 import streamlit as st
 import asyncio
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
 # 新しいAWSServiceCodeHelperをインポート
 try:
     from .aws_service_code_helper import get_service_code_helper
@@ -27,16 +42,19 @@ try:
 except ImportError as import_error:
     logging.warning(f"💼 [AWSServiceCodeHelper] インポート失敗: {import_error}")
     
-    # フォールバック関数を定義
+    # フォールバック関数を定義（ヘルパーは状態を持たないため単一インスタンスを共有）
+    class FallbackHelper:
+        def find_service_code(self, service_name):
+            return None
+        def search_services(self, keyword):
+            return []
+        def get_service_info(self, service_name):
+            return None
+    
+    _FALLBACK_HELPER = FallbackHelper()
+    
     def get_service_code_helper():
-        class FallbackHelper:
-            def find_service_code(self, service_name):
-                return None
-            def search_services(self, keyword):
-                return []
-            def get_service_info(self, service_name):
-                return None
-        return FallbackHelper()
+        return _FALLBACK_HELPER
 
 try:
     from langchain_mcp_adapters.client import MultiServerMCPClient
@@ -46,27 +64,293 @@ except ImportError:
     MultiServerMCPClient = None
 
 
+@functools.lru_cache(maxsize=32)
+def _services_fingerprint(services: Tuple[str, ...]) -> Tuple[str, str]:
+    """サービスリストからソート済みキーと表示用文字列を一度に生成"""
+    sorted_list = sorted(services)
+    return '-'.join(sorted_list), ', '.join(services)
+
+
+def _repr_keys(value: Any) -> Any:
+    """dictのキーをrepr()で文字列化（型の混在したキーでもソートできるようにする）"""
+    if isinstance(value, dict):
+        return {repr(key): _repr_keys(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_repr_keys(item) for item in value]
+    return value
+
+
+def _canonical_json_bytes(value: Any) -> bytes:
+    """
+    キー順をソートした正規化JSONバイト列を生成（orjsonが利用可能な場合はC実装を使用）
+    
+    Args:
+        value: シリアライズ対象の値（JSON非対応の値はstr()で文字列化）
+        
+    Returns:
+        正規化されたJSONバイト列
+    """
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(value, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    try:
+        return json.dumps(
+            value, default=str, sort_keys=True, ensure_ascii=False, separators=(',', ':')
+        ).encode('utf-8')
+    except TypeError:
+        # 型の混在したキー（'str' と 'int' の比較不可）などはキーをrepr()で文字列化して再試行
+        return json.dumps(
+            _repr_keys(value), default=str, sort_keys=True, ensure_ascii=False, separators=(',', ':')
+        ).encode('utf-8')
+
+
+# 最適化推奨事項の解析用パターン（行ごとに1回の走査で判定）
+_RECOMMENDATION_ITEM_RE = re.compile(r'^(?:\d+\.|[-•])')
+_SAVINGS_RE = re.compile(r'\$(\d+\.?\d*)')
+_HIGH_PRIORITY_RE = re.compile(r'critical|high|urgent', re.IGNORECASE)
+_LOW_PRIORITY_RE = re.compile(r'low|minor|optional', re.IGNORECASE)
+
+# Core MCPガイダンスのトピック判定（1回の走査で該当トピックを収集）
+_GUIDANCE_TOPIC_RE = re.compile(
+    r'(?P<vpc>vpc|network|subnet)|(?P<serverless>lambda|serverless)|(?P<database>rds|database)',
+    re.IGNORECASE
+)
+# トピック別ガイダンス（複数該当時は定義順に優先）
+_GUIDANCE_BY_TOPIC = {
+    "vpc": "VPC設計では、パブリック/プライベートサブネットの分離、マルチAZ構成、適切なルーティング設定を考慮してください。",
+    "serverless": "サーバーレス構成では、イベント駆動設計、適切な権限設定、コールドスタート対策を考慮してください。",
+    "database": "データベース設計では、マルチAZ、バックアップ戦略、セキュリティグループ、暗号化を考慮してください。"
+}
+_DEFAULT_GUIDANCE = "AWS Well-Architected Frameworkに基づき、信頼性、セキュリティ、コスト効率、パフォーマンスを考慮した設計を心がけてください。"
+
+
+def _select_guidance(prompt: str) -> str:
+    """プロンプトに含まれるトピックから基本的なガイダンスを選択"""
+    topics = {match.lastgroup for match in _GUIDANCE_TOPIC_RE.finditer(prompt)}
+    return next(
+        (guidance for topic, guidance in _GUIDANCE_BY_TOPIC.items() if topic in topics),
+        _DEFAULT_GUIDANCE
+    )
+
+
+# テンプレートファイルの配置ディレクトリ（src/templates）
+_TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
+
+# Terraformテンプレートの選択キーワード（1回の走査で該当キーワードを収集）
+_TERRAFORM_KEYWORD_RE = re.compile(r'vpc|lambda', re.IGNORECASE)
+# キーワード別の基本Terraformテンプレートファイル（複数該当時は定義順に優先）
+_TERRAFORM_TEMPLATES = {
+    "vpc": "terraform_vpc.tf",
+    "lambda": "terraform_lambda.tf"
+}
+_DEFAULT_TERRAFORM_TEMPLATE = "# 詳細な要件を指定してください。MCP統合により、より具体的なTerraformコードが生成されます。"
+# MCPツール呼び出し失敗時のフォールバックテンプレートファイル
+_FALLBACK_TERRAFORM_TEMPLATES = {
+    "vpc": "terraform_vpc_fallback.tf"
+}
+_FALLBACK_DEFAULT_TERRAFORM_TEMPLATE = "# 詳細な要件を指定してください。"
+
+
+def _normalize_requirements(requirements: str) -> str:
+    """テンプレート選択・キャッシュ用に要件文字列を正規化"""
+    return requirements.strip().lower()
+
+
+@functools.lru_cache(maxsize=128)
+def _terraform_keywords(normalized_requirements: str) -> frozenset:
+    """正規化済みの要件に含まれるテンプレート選択キーワードを返す"""
+    return frozenset(match.group(0) for match in _TERRAFORM_KEYWORD_RE.finditer(normalized_requirements))
+
+
+@functools.lru_cache(maxsize=None)
+def _load_terraform_template(file_name: str) -> Optional[str]:
+    """Terraformテンプレートファイルを読み込んでキャッシュ（読み込み失敗時はNone）"""
+    template_path = _TEMPLATES_DIR / file_name
+    try:
+        return template_path.read_text(encoding='utf-8')
+    except OSError as e:
+        logging.warning(f"Terraformテンプレートの読み込みに失敗しました: {template_path} ({e})")
+        return None
+
+
+def _match_terraform_template(requirements: str, templates: Dict[str, str]) -> Optional[str]:
+    """要件に含まれるキーワードに対応するテンプレートを返す（該当なし・読み込み失敗時はNone）"""
+    keywords = _terraform_keywords(_normalize_requirements(requirements))
+    file_name = next((name for keyword, name in templates.items() if keyword in keywords), None)
+    return _load_terraform_template(file_name) if file_name else None
+
+
+# コスト見積もりで受け付けるリージョン
+_VALID_REGIONS = frozenset((
+    "us-east-1", "us-east-2", "us-west-1", "us-west-2",
+    "eu-west-1", "eu-west-2", "eu-west-3", "eu-central-1",
+    "ap-northeast-1", "ap-northeast-2", "ap-southeast-1", "ap-southeast-2",
+    "ap-south-1", "ca-central-1", "sa-east-1"
+))
+
+# ローカルで提供する基本的なドキュメント情報（先頭から順に照合）
+_COMMON_SERVICE_DOCS = {
+    "ec2": "Amazon EC2は、クラウド内で安全でサイズ変更可能な仮想サーバーを提供します。",
+    "s3": "Amazon S3は、業界トップクラスのスケーラビリティ、データ可用性、セキュリティ、パフォーマンスを提供するオブジェクトストレージサービスです。",
+    "rds": "Amazon RDSは、クラウド内でリレーショナルデータベースの設定、運用、スケーリングを簡単に行えるWebサービスです。",
+    "lambda": "AWS Lambdaは、サーバーのプロビジョニングや管理なしにコードを実行できるコンピューティングサービスです。"
+}
+
+# MCPツール呼び出し失敗時のドキュメント情報（先頭から順に照合）
+_FALLBACK_SERVICE_DOCS = {
+    "ec2": "Amazon EC2は、AWS クラウドでスケーラブルなコンピューティング容量を提供します。",
+    "s3": "Amazon S3は、業界をリードするスケーラビリティ、データ可用性、セキュリティ、パフォーマンスを提供するオブジェクトストレージサービスです。",
+    "rds": "Amazon RDSでは、クラウドでリレーショナルデータベースを簡単にセットアップ、運用、スケールできます。",
+    "lambda": "AWS Lambdaは、サーバーをプロビジョニングまたは管理することなく、コードを実行できるコンピューティングサービスです。"
+}
+
+# フォールバック見積もり: リージョン別料金倍率（us-east-1を基準）
+_REGION_COST_MULTIPLIERS = {
+    "us-east-1": 1.0, "us-east-2": 1.02, "us-west-1": 1.08, "us-west-2": 1.05,
+    "eu-west-1": 1.1, "eu-west-2": 1.12, "eu-west-3": 1.15, "eu-central-1": 1.13,
+    "ap-northeast-1": 1.15, "ap-northeast-2": 1.12, "ap-southeast-1": 1.12, 
+    "ap-southeast-2": 1.14, "ap-south-1": 1.08, "ca-central-1": 1.06, "sa-east-1": 1.18
+}
+
+# フォールバック見積もり: インスタンスタイプ別倍率
+_INSTANCE_COST_MULTIPLIERS = {
+    # T3 系（バーストable）
+    "t3.nano": 0.3, "t3.micro": 0.5, "t3.small": 1.0, "t3.medium": 1.8,
+    "t3.large": 3.6, "t3.xlarge": 7.2, "t3.2xlarge": 14.4,
+    # T4g 系（ARM）
+    "t4g.nano": 0.25, "t4g.micro": 0.45, "t4g.small": 0.9, "t4g.medium": 1.6,
+    "t4g.large": 3.2, "t4g.xlarge": 6.4, "t4g.2xlarge": 12.8,
+    # M5 系（汎用）
+    "m5.large": 4.0, "m5.xlarge": 8.0, "m5.2xlarge": 16.0, "m5.4xlarge": 32.0,
+    # C5 系（コンピューティング最適化）
+    "c5.large": 3.8, "c5.xlarge": 7.6, "c5.2xlarge": 15.2, "c5.4xlarge": 30.4,
+    # R5 系（メモリ最適化）
+    "r5.large": 5.2, "r5.xlarge": 10.4, "r5.2xlarge": 20.8, "r5.4xlarge": 41.6
+}
+
+# フォールバック見積もり: サービス別基本料金（月額USD、us-east-1の標準構成）
+_FALLBACK_BASE_COSTS = {
+    "AmazonEC2": 25, "AmazonS3": 8, "AmazonRDS": 85, "AWSLambda": 12,
+    "AmazonCloudFront": 15, "AmazonVPC": 5, "AmazonDynamoDB": 18,
+    "AmazonECS": 30, "AmazonEKS": 75, "AmazonLightsail": 20,
+    "AmazonEFS": 35, "AmazonFSx": 120, "AmazonRedshift": 180,
+    "AmazonElastiCache": 95, "AmazonBedrock": 45, "AmazonSageMaker": 150,
+    "AmazonSNS": 2, "AmazonSQS": 3, "AmazonCloudWatch": 12,
+    "AmazonRoute53": 8, "AWSELB": 25
+}
+
+# フォールバック見積もり: サービス固有の最適化提案
+_SERVICE_OPTIMIZATION_HINTS = {
+    "AmazonEC2": "Spot Instanceで最大90%の削減可能",
+    "AmazonS3": "Intelligent Tieringで自動コスト最適化",
+    "AmazonRDS": "Aurora Serverlessで使用量ベース課金"
+}
+
+# フォールバックレポート: サービス名に含まれるキーワード別の月額コスト（先頭から順に判定）
+_FALLBACK_REPORT_COSTS = (
+    ("EC2", 85),
+    ("S3", 20),
+    ("RDS", 150),
+    ("LAMBDA", 25),
+)
+_FALLBACK_REPORT_DEFAULT_COST = 50
+
+
+@functools.lru_cache(maxsize=128)
+def _fallback_report_cost(service: str) -> int:
+    """サービス名からフォールバックレポート用の月額コストを判定"""
+    service_upper = service.upper()
+    for keyword, cost in _FALLBACK_REPORT_COSTS:
+        if keyword in service_upper:
+            return cost
+    return _FALLBACK_REPORT_DEFAULT_COST
+
+
+# LFU削除時に参照回数を比較する候補数（最も古く使われた側から数件のみ調べ、削除をO(1)に保つ）
+_EVICTION_SAMPLE_SIZE = 8
+
+
+# ディスク層のshelve（パスごとにプロセス内で1つだけ開き、排他用ロックと共にインスタンス間で共有）
+_DISK_SHELVES: Dict[str, Tuple[shelve.Shelf, threading.Lock]] = {}
+_DISK_SHELVES_LOCK = threading.Lock()
+
+
+@atexit.register
+def _close_disk_shelves() -> None:
+    """プロセス終了時に開いているshelveを閉じて書き込みを確定"""
+    with _DISK_SHELVES_LOCK:
+        for shelf, lock in _DISK_SHELVES.values():
+            with lock:
+                try:
+                    shelf.close()
+                except Exception:
+                    pass
+        _DISK_SHELVES.clear()
+
+
+class _CacheEntry:
+    """キャッシュエントリ（__slots__でエントリごとの__dict__を持たない）"""
+    
+    __slots__ = ("value", "expires_at", "hits")
+    
+    def __init__(self, value: Any, expires_at: float, hits: int = 0):
+        self.value = value
+        self.expires_at = expires_at
+        self.hits = hits
+
+
 class MCPRequestCache:
     """MCPリクエストのキャッシュ機構"""
     
-    def __init__(self, default_ttl: int = 300):  # デフォルト5分
+    def __init__(self, default_ttl: int = 300, max_size: int = 256, path: Optional[str] = None):  # デフォルト5分
         """
         キャッシュを初期化
         
         Args:
             default_ttl: デフォルトのTTL（秒）
+            max_size: 保持する最大エントリ数（超過時は最も古く使われた側の候補から、期限切れの
+                      エントリ、次に参照回数が最も少ないエントリを削除。参照回数は max_size 回の
+                      挿入ごとに半減させ、過去の参照だけでエントリが残り続けないようにする）
+            path: ディスク永続化先（shelveファイル）。未指定時は環境変数 MCP_CACHE_PATH を使用し、
+                  どちらも無い場合はメモリのみでキャッシュする
         """
-        self.cache: Dict[str, Dict[str, Any]] = {}
+        # 挿入・参照順を保持し、LFUの同数時はLRU順で削除する
+        self.cache: "OrderedDict[str, _CacheEntry]" = OrderedDict()
         self.default_ttl = default_ttl
+        self.max_size = max_size
         self.stats = {
             "hits": 0,
             "misses": 0,
             "total_requests": 0,
-            "cache_size": 0
+            "cache_size": 0,
+            "evictions": 0
         }
+        # 参照回数を半減させるまでの残り挿入回数の管理用
+        self._inserts_since_decay = 0
+        # メモリ層・統計の排他制御（コスト分析ツールなど複数スレッドから同時に利用されるため）
+        self._lock = threading.Lock()
         self.logger = logging.getLogger(__name__ + ".cache")
         
-    def _generate_cache_key(self, method: str, *args, **kwargs) -> str:
+        # 時刻取得元（テストで差し替え可能）。メモリ層はシステム時刻の変更に影響されない単調時計、
+        # ディスク層はプロセスを跨いで比較するため実時刻を使用する
+        self._clock = time.monotonic
+        self._wall_clock = time.time
+        
+        # ディスク層（プロセス再起動後も有効期限内の結果を再利用）
+        self.path = path or os.getenv("MCP_CACHE_PATH") or None
+        self._disk_shelf: Optional[shelve.Shelf] = None
+        self._disk_lock: Optional[threading.Lock] = None
+        if self.path:
+            try:
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            except OSError as e:
+                # 作成できないパスの場合は例外にせず、メモリのみでキャッシュする
+                self.logger.warning(f"ディスクキャッシュを無効化します（ディレクトリ作成エラー: {e}）")
+                self.path = None
+        
+    def make_key(self, method: str, *args, **kwargs) -> str:
         """
         リクエストパラメータからキャッシュキーを生成
         
@@ -78,11 +362,11 @@ class MCPRequestCache:
         Returns:
             ハッシュ化されたキャッシュキー
         """
-        # リクエストパラメータを文字列に変換
-        params_str = f"{method}:{str(args)}:{str(sorted(kwargs.items()))}"
+        # リクエストパラメータをキー順にソートした正規化JSONに変換
+        payload = _canonical_json_bytes([method, args, kwargs])
         
-        # SHA256でハッシュ化
-        cache_key = hashlib.sha256(params_str.encode('utf-8')).hexdigest()
+        # BLAKE2b（16バイト）でハッシュ化（短い入力ではSHA256より高速）
+        cache_key = hashlib.blake2b(payload, digest_size=16).hexdigest()
         
         return cache_key
     
@@ -98,24 +382,49 @@ class MCPRequestCache:
         Returns:
             キャッシュされた値、または None
         """
-        cache_key = self._generate_cache_key(method, *args, **kwargs)
-        self.stats["total_requests"] += 1
+        return self.get_by_key(method, self.make_key(method, *args, **kwargs))
+    
+    def get_by_key(self, method: str, cache_key: str) -> Optional[Any]:
+        """
+        make_key() で生成済みのキーでキャッシュから値を取得
         
-        if cache_key in self.cache:
-            cache_entry = self.cache[cache_key]
+        Args:
+            method: 呼び出しメソッド名（ログ出力用）
+            cache_key: make_key() で生成したキャッシュキー
             
-            # TTL チェック
-            if time.time() < cache_entry["expires_at"]:
-                self.stats["hits"] += 1
-                self.logger.debug(f"キャッシュヒット: {method} - キー: {cache_key[:8]}...")
-                return cache_entry["value"]
-            else:
-                # 期限切れのエントリを削除
-                del self.cache[cache_key]
-                self.stats["cache_size"] = len(self.cache)
-                self.logger.debug(f"キャッシュ期限切れ: {method} - キー: {cache_key[:8]}...")
-        
-        self.stats["misses"] += 1
+        Returns:
+            キャッシュされた値、または None
+        """
+        with self._lock:
+            self.stats["total_requests"] += 1
+            cache_entry = self.cache.get(cache_key)
+            if cache_entry is not None:
+                # TTL チェック（参照しても有効期限は延長しない）
+                if self._clock() < cache_entry.expires_at:
+                    cache_entry.hits += 1
+                    self.cache.move_to_end(cache_key)
+                    self.stats["hits"] += 1
+                    self.logger.debug(f"キャッシュヒット: {method} - キー: {cache_key[:8]}...")
+                    return cache_entry.value
+                else:
+                    # 期限切れのエントリを削除
+                    del self.cache[cache_key]
+                    self.stats["cache_size"] = len(self.cache)
+                    self.logger.debug(f"キャッシュ期限切れ: {method} - キー: {cache_key[:8]}...")
+        
+        # メモリに無い場合はディスク層を確認（ディスクI/Oはメモリ層のロック外で行う）
+        disk_entry = self._disk_get(cache_key)
+        if disk_entry is not None:
+            remaining_ttl = disk_entry["expires_at"] - self._wall_clock()
+            if remaining_ttl > 0:
+                with self._lock:
+                    self._store(cache_key, disk_entry["value"], remaining_ttl)
+                    self.stats["hits"] += 1
+                self.logger.debug(f"ディスクキャッシュヒット: {method} - キー: {cache_key[:8]}...")
+                return disk_entry["value"]
+        
+        with self._lock:
+            self.stats["misses"] += 1
         self.logger.debug(f"キャッシュミス: {method} - キー: {cache_key[:8]}...")
         return None
     
@@ -130,37 +439,140 @@ class MCPRequestCache:
             *args: 位置引数
             **kwargs: キーワード引数
         """
-        cache_key = self._generate_cache_key(method, *args, **kwargs)
-        expires_at = time.time() + (ttl or self.default_ttl)
-        
-        self.cache[cache_key] = {
-            "value": value,
-            "expires_at": expires_at,
-            "created_at": time.time(),
-            "method": method
-        }
+        self.set_by_key(method, self.make_key(method, *args, **kwargs), value, ttl)
+    
+    def set_by_key(self, method: str, cache_key: str, value: Any, ttl: Optional[int] = None) -> None:
+        """
+        make_key() で生成済みのキーで値をキャッシュに保存
+        
+        Args:
+            method: 呼び出しメソッド名（ログ出力用）
+            cache_key: make_key() で生成したキャッシュキー
+            value: 保存する値
+            ttl: TTL（秒）、Noneの場合はデフォルトTTLを使用
+        """
+        ttl = ttl or self.default_ttl
+        
+        with self._lock:
+            self._store(cache_key, value, ttl)
+        self._disk_set(cache_key, value, ttl)
+        self.logger.debug(f"キャッシュ保存: {method} - キー: {cache_key[:8]}... - TTL: {ttl}秒")
+    
+    def _store(self, cache_key: str, value: Any, ttl: float) -> None:
+        """メモリ上のキャッシュにエントリを保存（呼び出し側で self._lock を保持すること）"""
+        existing = self.cache.get(cache_key)
+        if existing is None:
+            # 新規キーで上限に達している場合は候補から1件ずつ削除
+            while self.cache and len(self.cache) >= self.max_size:
+                del self.cache[self._select_victim()]
+                self.stats["evictions"] += 1
+            self._age_hits()
+        
+        # 既存キーの更新時は参照回数を引き継ぐ
+        hits = existing.hits if existing is not None else 0
+        self.cache[cache_key] = _CacheEntry(value, self._clock() + ttl, hits)
+        self.cache.move_to_end(cache_key)
         
         self.stats["cache_size"] = len(self.cache)
-        self.logger.debug(f"キャッシュ保存: {method} - キー: {cache_key[:8]}... - TTL: {ttl or self.default_ttl}秒")
+    
+    def _select_victim(self) -> str:
+        """
+        削除対象のキーを選択
+        
+        OrderedDictは古く使われた順に並ぶため、先頭の数件のみを候補とする。
+        候補中に期限切れのエントリがあればそれを、無ければ参照回数が最も少ないもの
+        （同数なら最も古く使われたもの）を返す。
+        """
+        now = self._clock()
+        victim, victim_hits = None, 0
+        for key in islice(self.cache, _EVICTION_SAMPLE_SIZE):
+            entry = self.cache[key]
+            if now >= entry.expires_at:
+                return key
+            if victim is None or entry.hits < victim_hits:
+                victim, victim_hits = key, entry.hits
+        return victim
+    
+    def _age_hits(self) -> None:
+        """max_size 回の挿入ごとに全エントリの参照回数を半減（償却O(1)）"""
+        self._inserts_since_decay += 1
+        if self._inserts_since_decay >= self.max_size:
+            self._inserts_since_decay = 0
+            for entry in self.cache.values():
+                entry.hits >>= 1
+    
+    def _disk(self) -> Optional[shelve.Shelf]:
+        """
+        ディスク層のshelveを取得（ディスク層が無効の場合はNone）
+        
+        shelveは初回のみ開き、同じパスを使う全インスタンスで1つのハンドルを共有する。
+        開けない場合はディスク層を無効化し、以降はメモリのみでキャッシュする。
+        """
+        if self._disk_shelf is not None or not self.path:
+            return self._disk_shelf
+        with _DISK_SHELVES_LOCK:
+            opened = _DISK_SHELVES.get(self.path)
+            if opened is None:
+                try:
+                    opened = (shelve.open(self.path), threading.Lock())
+                except Exception as e:
+                    self.logger.warning(f"ディスクキャッシュを無効化します（オープンエラー: {e}）")
+                    self.path = None
+                    return None
+                _DISK_SHELVES[self.path] = opened
+        self._disk_shelf, self._disk_lock = opened
+        return self._disk_shelf
+    
+    def _disk_get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """ディスク層からエントリを取得（ディスク層が無効または読み込み失敗時はNone）"""
+        db = self._disk()
+        if db is None:
+            return None
+        try:
+            with self._disk_lock:
+                return db.get(cache_key)
+        except Exception as e:
+            self.logger.warning(f"ディスクキャッシュ読み込みエラー: {e}")
+            return None
+    
+    def _disk_set(self, cache_key: str, value: Any, ttl: float) -> None:
+        """ディスク層にエントリを保存（有効期限はプロセスを跨ぐため実時刻で保持）"""
+        db = self._disk()
+        if db is None:
+            return
+        try:
+            with self._disk_lock:
+                db[cache_key] = {"value": value, "expires_at": self._wall_clock() + ttl}
+        except Exception as e:
+            self.logger.warning(f"ディスクキャッシュ書き込みエラー: {e}")
     
     def clear(self) -> None:
-        """キャッシュをクリア"""
-        self.cache.clear()
-        self.stats["cache_size"] = 0
+        """キャッシュをクリア（ディスク層も含む）"""
+        with self._lock:
+            self.cache.clear()
+            self.stats["cache_size"] = 0
+        db = self._disk()
+        if db is not None:
+            try:
+                with self._disk_lock:
+                    db.clear()
+            except Exception as e:
+                self.logger.warning(f"ディスクキャッシュのクリアエラー: {e}")
         self.logger.info("キャッシュをクリアしました")
     
     def cleanup_expired(self) -> int:
         """期限切れのキャッシュエントリを削除"""
-        current_time = time.time()
-        expired_keys = [
-            key for key, entry in self.cache.items()
-            if current_time >= entry["expires_at"]
-        ]
-        
-        for key in expired_keys:
-            del self.cache[key]
-        
-        self.stats["cache_size"] = len(self.cache)
+        with self._lock:
+            current_time = self._clock()
+            expired_keys = [
+                key for key, entry in self.cache.items()
+                if current_time >= entry.expires_at
+            ]
+            
+            for key in expired_keys:
+                del self.cache[key]
+            
+            self.stats["cache_size"] = len(self.cache)
         
         if expired_keys:
             self.logger.info(f"期限切れキャッシュエントリを {len(expired_keys)} 個削除しました")
@@ -169,13 +581,17 @@ class MCPRequestCache:
     
     def get_stats(self) -> Dict[str, Any]:
         """キャッシュ統計を取得"""
-        total_requests = self.stats["total_requests"]
-        hit_rate = (self.stats["hits"] / total_requests * 100) if total_requests > 0 else 0
+        with self._lock:
+            stats = dict(self.stats)
+            cache_entries = len(self.cache)
+        
+        total_requests = stats["total_requests"]
+        hit_rate = (stats["hits"] / total_requests * 100) if total_requests > 0 else 0
         
         return {
-            **self.stats,
+            **stats,
             "hit_rate": round(hit_rate, 2),
-            "cache_entries": len(self.cache)
+            "cache_entries": cache_entries
         }
 
 
@@ -200,6 +616,10 @@ class MCPClientService:
         # リクエストキャッシュを初期化
         self.request_cache = MCPRequestCache(default_ttl=300)  # 5分のデフォルトTTL
         
+        # 実行中のコスト見積もり（同一構成の同時リクエストで結果を共有）
+        self._inflight_estimates: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        
     def _get_default_config_path(self) -> str:
         """デフォルトの設定ファイルパスを取得"""
         project_root = Path(__file__).parent.parent.parent
@@ -559,15 +979,7 @@ class MCPClientService:
             # result = self.call_mcp_tool("awslabs.core-mcp-server", "prompt_understanding", prompt=prompt)
             
             # 現在は基本的なガイダンスを提供
-            result = None
-            if any(keyword in prompt.lower() for keyword in ["vpc", "network", "subnet"]):
-                result = "VPC設計では、パブリック/プライベートサブネットの分離、マルチAZ構成、適切なルーティング設定を考慮してください。"
-            elif any(keyword in prompt.lower() for keyword in ["lambda", "serverless"]):
-                result = "サーバーレス構成では、イベント駆動設計、適切な権限設定、コールドスタート対策を考慮してください。"
-            elif any(keyword in prompt.lower() for keyword in ["rds", "database"]):
-                result = "データベース設計では、マルチAZ、バックアップ戦略、セキュリティグループ、暗号化を考慮してください。"
-            else:
-                result = "AWS Well-Architected Frameworkに基づき、信頼性、セキュリティ、コスト効率、パフォーマンスを考慮した設計を心がけてください。"
+            result = _select_guidance(prompt)
             
             # 結果をキャッシュに保存（ガイダンスは比較的長期間有効）
             if result:
@@ -600,16 +1012,10 @@ class MCPClientService:
             # return self.call_mcp_tool("awslabs.aws-documentation-mcp-server", "search_documentation", query=query)
             
             # 現在は基本的なドキュメント情報を提供
-            common_services = {
-                "ec2": "Amazon EC2は、クラウド内で安全でサイズ変更可能な仮想サーバーを提供します。",
-                "s3": "Amazon S3は、業界トップクラスのスケーラビリティ、データ可用性、セキュリティ、パフォーマンスを提供するオブジェクトストレージサービスです。",
-                "rds": "Amazon RDSは、クラウド内でリレーショナルデータベースの設定、運用、スケーリングを簡単に行えるWebサービスです。",
-                "lambda": "AWS Lambdaは、サーバーのプロビジョニングや管理なしにコードを実行できるコンピューティングサービスです。"
-            }
-            
             result = None
-            for service, description in common_services.items():
-                if service in query.lower():
+            query_lower = query.lower()
+            for service, description in _COMMON_SERVICE_DOCS.items():
+                if service in query_lower:
                     result = {"service": service, "description": description, "source": "local_cache"}
                     break
             
@@ -636,8 +1042,9 @@ class MCPClientService:
         Returns:
             生成されたTerraformコード、またはエラー時はNone
         """
-        # キャッシュから確認
-        cached_result = self.request_cache.get("generate_terraform_code", requirements)
+        # キャッシュから確認（大文字小文字・前後の空白のみ異なる要件は同一として扱う）
+        normalized_requirements = _normalize_requirements(requirements)
+        cached_result = self.request_cache.get("generate_terraform_code", normalized_requirements)
         if cached_result is not None:
             return cached_result
         
@@ -647,78 +1054,11 @@ class MCPClientService:
             # result = self.call_mcp_tool("awslabs.terraform-mcp-server", "generate_terraform", requirements=requirements)
             
             # 現在は基本的なTerraformテンプレートを提供
-            result = None
-            if "vpc" in requirements.lower():
-                result = '''
-# VPC基本構成テンプレート
-resource "aws_vpc" "main" {
-  cidr_block           = "10.0.0.0/16"
-  enable_dns_hostnames = true
-  enable_dns_support   = true
-  
-  tags = {
-    Name = "main-vpc"
-  }
-}
-
-resource "aws_subnet" "public" {
-  vpc_id                  = aws_vpc.main.id
-  cidr_block              = "10.0.1.0/24"
-  availability_zone       = data.aws_availability_zones.available.names[0]
-  map_public_ip_on_launch = true
-  
-  tags = {
-    Name = "public-subnet"
-  }
-}
-
-resource "aws_internet_gateway" "main" {
-  vpc_id = aws_vpc.main.id
-  
-  tags = {
-    Name = "main-igw"
-  }
-}
-'''
-            elif "lambda" in requirements.lower():
-                result = '''
-# Lambda基本構成テンプレート
-resource "aws_lambda_function" "main" {
-  filename         = "lambda.zip"
-  function_name    = "main-function"
-  role            = aws_iam_role.lambda_role.arn
-  handler         = "index.handler"
-  source_code_hash = filebase64sha256("lambda.zip")
-  runtime         = "python3.9"
-  
-  tags = {
-    Name = "main-lambda"
-  }
-}
-
-resource "aws_iam_role" "lambda_role" {
-  name = "lambda-execution-role"
-  
-  assume_role_policy = jsonencode({
-    Version = "2012-10-17"
-    Statement = [
-      {
-        Action = "sts:AssumeRole"
-        Effect = "Allow"
-        Principal = {
-          Service = "lambda.amazonaws.com"
-        }
-      }
-    ]
-  })
-}
-'''
-            else:
-                result = "# 詳細な要件を指定してください。MCP統合により、より具体的なTerraformコードが生成されます。"
+            result = _match_terraform_template(requirements, _TERRAFORM_TEMPLATES) or _DEFAULT_TERRAFORM_TEMPLATE
             
             # 結果をキャッシュに保存（Terraformコードは短期間有効）
             if result:
-                self.request_cache.set("generate_terraform_code", result, 180, requirements)  # 3分キャッシュ
+                self.request_cache.set("generate_terraform_code", result, 180, normalized_requirements)  # 3分キャッシュ
             
             return result
                 
@@ -747,12 +1087,51 @@ resource "aws_iam_role" "lambda_role" {
                 "reduction_rate": float     # 削減率 (0.0-1.0)
             }
         """
-        # キャッシュから確認
-        cache_key_data = f"{service_config.get('service_name')}_{service_config.get('instance_type', 'default')}_{service_config.get('region', 'us-east-1')}"
-        cached_result = self.request_cache.get("get_cost_estimation", cache_key_data)
+        # キャッシュから確認（使用量詳細も含めた構造から正規化キーを生成）
+        cache_key_data = self.request_cache.make_key(
+            "get_cost_estimation",
+            service_config.get("service_name"),
+            service_config.get("instance_type") or "default",
+            service_config.get("region", "us-east-1"),
+            service_config.get("usage_details") or {}
+        )
+        cached_result = self.request_cache.get_by_key("get_cost_estimation", cache_key_data)
         if cached_result is not None:
             return cached_result
         
+        # 同一構成の見積もりが実行中の場合は、その結果を待って共有する
+        with self._inflight_lock:
+            inflight = self._inflight_estimates.get(cache_key_data)
+            if inflight is None:
+                future: Future = Future()
+                self._inflight_estimates[cache_key_data] = future
+        
+        if inflight is not None:
+            self.logger.debug(f"実行中の同一見積もりを待機: {service_config.get('service_name')}")
+            return inflight.result()
+        
+        try:
+            result = self._fetch_cost_estimation(service_config, cache_key_data)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight_estimates.pop(cache_key_data, None)
+    
+    def _fetch_cost_estimation(self, service_config: Dict[str, Any], cache_key_data: str) -> Optional[Dict[str, Any]]:
+        """
+        コスト見積もりを取得（キャッシュ・重複排除を経由しない実処理）
+        
+        Args:
+            service_config: サービス構成情報
+            cache_key_data: 結果の保存に使うキャッシュキー
+            
+        Returns:
+            コスト見積もり結果、またはエラー時はNone
+        """
         try:
             # AWSServiceCodeHelperを使用して正しいサービスコードを取得
             service_name_input = service_config.get("service_name", "")
@@ -798,14 +1177,7 @@ resource "aws_iam_role" "lambda_role" {
                 return self._calculate_fallback_cost_estimate(service_name_input.upper(), region, instance_type)
             
             # 有効なリージョンをチェック
-            valid_regions = [
-                "us-east-1", "us-east-2", "us-west-1", "us-west-2",
-                "eu-west-1", "eu-west-2", "eu-west-3", "eu-central-1",
-                "ap-northeast-1", "ap-northeast-2", "ap-southeast-1", "ap-southeast-2",
-                "ap-south-1", "ca-central-1", "sa-east-1"
-            ]
-            
-            if region not in valid_regions:
+            if region not in _VALID_REGIONS:
                 self.logger.warning(f"無効なリージョン: {region}, デフォルトのus-east-1を使用")
                 region = "us-east-1"
             
@@ -872,7 +1244,7 @@ resource "aws_iam_role" "lambda_role" {
                 if result:
                     self.logger.info(f"   ✅ Cost Analysis結果変換成功: {result['cost']}USD/月")
                     # 結果をキャッシュに保存（コスト見積もりは短期間有効）
-                    self.request_cache.set("get_cost_estimation", result, 300, cache_key_data)  # 5分キャッシュ
+                    self.request_cache.set_by_key("get_cost_estimation", cache_key_data, result, 300)  # 5分キャッシュ
                     return result
                 else:
                     self.logger.warning(f"   ❌ Cost Analysis結果変換失敗")
@@ -884,7 +1256,7 @@ resource "aws_iam_role" "lambda_role" {
             if doc_result:
                 self.logger.info(f"   ✅ AWS Documentation MCP成功: {doc_result['cost']}USD/月")
                 # AWS Documentation MCPからの結果をキャッシュに保存
-                self.request_cache.set("get_cost_estimation", doc_result, 300, cache_key_data)
+                self.request_cache.set_by_key("get_cost_estimation", cache_key_data, doc_result, 300)
                 return doc_result
             else:
                 # AWS Documentation MCPも失敗した場合、最終フォールバック
@@ -1087,43 +1459,12 @@ resource "aws_iam_role" "lambda_role" {
         service_code_helper = get_service_code_helper()
         normalized_service_code = service_code_helper.find_service_code(service_name) or service_name
         
-        # リージョン別料金倍率（us-east-1を基準）
-        region_multiplier = {
-            "us-east-1": 1.0, "us-east-2": 1.02, "us-west-1": 1.08, "us-west-2": 1.05,
-            "eu-west-1": 1.1, "eu-west-2": 1.12, "eu-west-3": 1.15, "eu-central-1": 1.13,
-            "ap-northeast-1": 1.15, "ap-northeast-2": 1.12, "ap-southeast-1": 1.12, 
-            "ap-southeast-2": 1.14, "ap-south-1": 1.08, "ca-central-1": 1.06, "sa-east-1": 1.18
-        }.get(region, 1.0)
-        
-        # インスタンスタイプ別倍率
-        instance_multiplier = {
-            # T3 系（バーストable）
-            "t3.nano": 0.3, "t3.micro": 0.5, "t3.small": 1.0, "t3.medium": 1.8,
-            "t3.large": 3.6, "t3.xlarge": 7.2, "t3.2xlarge": 14.4,
-            # T4g 系（ARM）
-            "t4g.nano": 0.25, "t4g.micro": 0.45, "t4g.small": 0.9, "t4g.medium": 1.6,
-            "t4g.large": 3.2, "t4g.xlarge": 6.4, "t4g.2xlarge": 12.8,
-            # M5 系（汎用）
-            "m5.large": 4.0, "m5.xlarge": 8.0, "m5.2xlarge": 16.0, "m5.4xlarge": 32.0,
-            # C5 系（コンピューティング最適化）
-            "c5.large": 3.8, "c5.xlarge": 7.6, "c5.2xlarge": 15.2, "c5.4xlarge": 30.4,
-            # R5 系（メモリ最適化）
-            "r5.large": 5.2, "r5.xlarge": 10.4, "r5.2xlarge": 20.8, "r5.4xlarge": 41.6
-        }.get(instance_type, 1.0) if instance_type else 1.0
-        
-        # サービス別基本料金（月額USD、us-east-1の標準構成）
-        base_costs = {
-            "AmazonEC2": 25, "AmazonS3": 8, "AmazonRDS": 85, "AWSLambda": 12,
-            "AmazonCloudFront": 15, "AmazonVPC": 5, "AmazonDynamoDB": 18,
-            "AmazonECS": 30, "AmazonEKS": 75, "AmazonLightsail": 20,
-            "AmazonEFS": 35, "AmazonFSx": 120, "AmazonRedshift": 180,
-            "AmazonElastiCache": 95, "AmazonBedrock": 45, "AmazonSageMaker": 150,
-            "AmazonSNS": 2, "AmazonSQS": 3, "AmazonCloudWatch": 12,
-            "AmazonRoute53": 8, "AWSELB": 25
-        }
+        # リージョン別・インスタンスタイプ別の料金倍率
+        region_multiplier = _REGION_COST_MULTIPLIERS.get(region, 1.0)
+        instance_multiplier = _INSTANCE_COST_MULTIPLIERS.get(instance_type, 1.0) if instance_type else 1.0
         
         # 正規化されたサービスコードから基本料金を取得
-        base_cost = base_costs.get(normalized_service_code, 30)
+        base_cost = _FALLBACK_BASE_COSTS.get(normalized_service_code, 30)
         
         # 最終料金を計算
         final_cost = base_cost * region_multiplier * instance_multiplier
@@ -1142,12 +1483,9 @@ resource "aws_iam_role" "lambda_role" {
             optimization_suggestions.append("Savings Plansで最大72%の削減可能")
         
         # サービス固有の最適化
-        if normalized_service_code == "AmazonEC2":
-            optimization_suggestions.append("Spot Instanceで最大90%の削減可能")
-        elif normalized_service_code == "AmazonS3":
-            optimization_suggestions.append("Intelligent Tieringで自動コスト最適化")
-        elif normalized_service_code == "AmazonRDS":
-            optimization_suggestions.append("Aurora Serverlessで使用量ベース課金")
+        service_hint = _SERVICE_OPTIMIZATION_HINTS.get(normalized_service_code)
+        if service_hint:
+            optimization_suggestions.append(service_hint)
         
         optimization = "; ".join(optimization_suggestions) if optimization_suggestions else "詳細分析が必要"
         
@@ -1383,8 +1721,7 @@ resource "aws_iam_role" "lambda_role" {
             プロジェクトコスト分析結果、またはエラー時はNone
         """
         # キャッシュから確認
-        cache_key = f"{project_path}_{project_type}"
-        cached_result = self.request_cache.get("analyze_infrastructure_project_cost", cache_key)
+        cached_result = self.request_cache.get("analyze_infrastructure_project_cost", project_path, project_type)
         if cached_result is not None:
             return cached_result
         
@@ -1400,7 +1737,7 @@ resource "aws_iam_role" "lambda_role" {
             
             if result:
                 # 結果をキャッシュに保存（中期間有効）
-                self.request_cache.set("analyze_infrastructure_project_cost", result, 900, cache_key)  # 15分キャッシュ
+                self.request_cache.set("analyze_infrastructure_project_cost", result, 900, project_path, project_type)  # 15分キャッシュ
                 return result
             else:
                 return None
@@ -1421,14 +1758,14 @@ resource "aws_iam_role" "lambda_role" {
             包括的なコストレポート、またはエラー時はNone
         """
         # キャッシュから確認
-        cache_key = f"{'-'.join(sorted(services))}_{region}"
-        cached_result = self.request_cache.get("generate_comprehensive_cost_report", cache_key)
+        sorted_joined, original_joined = _services_fingerprint(tuple(services))
+        cached_result = self.request_cache.get("generate_comprehensive_cost_report", sorted_joined, region)
         if cached_result is not None:
             return cached_result
         
         try:
             # サービスリストとリージョンを含むクエリを構築
-            query = f"Generate comprehensive cost report for AWS services: {', '.join(services)} in {region} region with optimization recommendations"
+            query = f"Generate comprehensive cost report for AWS services: {original_joined} in {region} region with optimization recommendations"
             
             # Cost Analysis MCP Serverの包括的レポート生成機能を呼び出し
             result = self.call_mcp_tool("awslabs.cost-analysis-mcp-server", "generate_cost_report", 
@@ -1436,7 +1773,7 @@ resource "aws_iam_role" "lambda_role" {
             
             if result:
                 # 結果をキャッシュに保存（短期間有効）
-                self.request_cache.set("generate_comprehensive_cost_report", result, 300, cache_key)  # 5分キャッシュ
+                self.request_cache.set("generate_comprehensive_cost_report", result, 300, sorted_joined, region)  # 5分キャッシュ
                 return str(result)
             else:
                 return None
@@ -1456,8 +1793,7 @@ resource "aws_iam_role" "lambda_role" {
             最適化推奨事項リスト、またはエラー時はNone
         """
         # キャッシュから確認
-        cache_key = str(sorted(current_setup.items()))
-        cached_result = self.request_cache.get("get_cost_optimization_recommendations", cache_key)
+        cached_result = self.request_cache.get("get_cost_optimization_recommendations", current_setup)
         if cached_result is not None:
             return cached_result
         
@@ -1477,7 +1813,7 @@ resource "aws_iam_role" "lambda_role" {
                     recommendations = [{"recommendation": str(result), "priority": "medium"}]
                 
                 # 結果をキャッシュに保存（中期間有効）
-                self.request_cache.set("get_cost_optimization_recommendations", recommendations, 600, cache_key)  # 10分キャッシュ
+                self.request_cache.set("get_cost_optimization_recommendations", recommendations, 600, current_setup)  # 10分キャッシュ
                 return recommendations
             else:
                 return None
@@ -1496,8 +1832,6 @@ resource "aws_iam_role" "lambda_role" {
         Returns:
             構造化された推奨事項リスト
         """
-        import re
-        
         recommendations = []
         
         # 推奨事項のパターンを検索
@@ -1510,7 +1844,7 @@ resource "aws_iam_role" "lambda_role" {
                 continue
                 
             # 推奨事項の開始を検出
-            if re.match(r'^\d+\.', line) or line.startswith('-') or line.startswith('•'):
+            if _RECOMMENDATION_ITEM_RE.match(line):
                 if current_recommendation:
                     recommendations.append(current_recommendation)
                 
@@ -1521,14 +1855,14 @@ resource "aws_iam_role" "lambda_role" {
                 }
             
             # 節約額を抽出
-            savings_match = re.search(r'\$(\d+\.?\d*)', line)
+            savings_match = _SAVINGS_RE.search(line)
             if savings_match and current_recommendation:
                 current_recommendation["estimated_savings"] = float(savings_match.group(1))
             
             # 優先度を推定
-            if any(keyword in line.lower() for keyword in ["critical", "high", "urgent"]):
+            if _HIGH_PRIORITY_RE.search(line):
                 current_recommendation["priority"] = "high"
-            elif any(keyword in line.lower() for keyword in ["low", "minor", "optional"]):
+            elif _LOW_PRIORITY_RE.search(line):
                 current_recommendation["priority"] = "low"
         
         # 最後の推奨事項を追加
@@ -1650,17 +1984,7 @@ resource "aws_iam_role" "lambda_role" {
         
         for service in services:
             # 簡単なコスト推定
-            if "EC2" in service.upper():
-                cost = 85
-            elif "S3" in service.upper():
-                cost = 20
-            elif "RDS" in service.upper():
-                cost = 150
-            elif "LAMBDA" in service.upper():
-                cost = 25
-            else:
-                cost = 50
-                
+            cost = _fallback_report_cost(service)
             service_costs[service] = cost
             total_cost += cost
         
@@ -1679,16 +2003,10 @@ resource "aws_iam_role" "lambda_role" {
         """AWS Documentation フォールバック"""
         self.logger.info(f"📚 AWS Documentation フォールバック: {query}")
         
-        common_docs = {
-            "ec2": "Amazon EC2は、AWS クラウドでスケーラブルなコンピューティング容量を提供します。",
-            "s3": "Amazon S3は、業界をリードするスケーラビリティ、データ可用性、セキュリティ、パフォーマンスを提供するオブジェクトストレージサービスです。",
-            "rds": "Amazon RDSでは、クラウドでリレーショナルデータベースを簡単にセットアップ、運用、スケールできます。",
-            "lambda": "AWS Lambdaは、サーバーをプロビジョニングまたは管理することなく、コードを実行できるコンピューティングサービスです。"
-        }
-        
         description = "AWS公式ドキュメントを参照してください。"
-        for key, desc in common_docs.items():
-            if key in query.lower():
+        query_lower = query.lower()
+        for key, desc in _FALLBACK_SERVICE_DOCS.items():
+            if key in query_lower:
                 description = desc
                 break
         
@@ -1704,31 +2022,7 @@ resource "aws_iam_role" "lambda_role" {
         self.logger.info(f"🏗️ Terraform生成フォールバック: {requirements}")
         
         # 基本的なTerraformテンプレートを返す
-        if "vpc" in requirements.lower():
-            code = '''
-# VPC基本構成
-resource "aws_vpc" "main" {
-  cidr_block           = "10.0.0.0/16"
-  enable_dns_hostnames = true
-  enable_dns_support   = true
-  
-  tags = {
-    Name = "main-vpc"
-  }
-}
-
-resource "aws_subnet" "public" {
-  vpc_id                  = aws_vpc.main.id
-  cidr_block              = "10.0.1.0/24"
-  map_public_ip_on_launch = true
-  
-  tags = {
-    Name = "public-subnet"
-  }
-}
-'''
-        else:
-            code = "# 詳細な要件を指定してください。"
+        code = _match_terraform_template(requirements, _FALLBACK_TERRAFORM_TEMPLATES) or _FALLBACK_DEFAULT_TERRAFORM_TEMPLATE
         
         return {
             "requirements": requirements,
@@ -1738,6 +2032,23 @@ resource "aws_subnet" "public" {
         }
 
 
+class _DummyMCPClient:
+    """MCPクライアントを作成できない場合の基本的な機能のみ提供するダミークライアント"""
+    
+    def get_available_tools(self):
+        return []
+    def get_core_mcp_guidance(self, prompt):
+        return None
+    def get_aws_documentation(self, query):
+        return None
+    def generate_terraform_code(self, requirements):
+        return None
+
+
+# ダミークライアントは状態を持たないため単一インスタンスを共有
+_DUMMY_MCP_CLIENT = _DummyMCPClient()
+
+
 # Streamlit用のセッション管理
 def get_mcp_client() -> MCPClientService:
     """StreamlitセッションでMCPクライアントを取得/初期化"""
@@ -1781,17 +2092,6 @@ def get_mcp_client() -> MCPClientService:
     
     # MCPクライアントがNoneの場合はダミークライアントを返す
     if st.session_state.mcp_client is None:
-        # 基本的な機能のみ提供するダミークライアント
-        class DummyMCPClient:
-            def get_available_tools(self):
-                return []
-            def get_core_mcp_guidance(self, prompt):
-                return None
-            def get_aws_documentation(self, query):
-                return None
-            def generate_terraform_code(self, requirements):
-                return None
-        
-        return DummyMCPClient()
+        return _DUMMY_MCP_CLIENT
     
     return st.session_state.mcp_client
\ No newline at end of file
@@ -0,0 +1,30 @@
+# Lambda基本構成テンプレート
+resource "aws_lambda_function" "main" {
+  filename         = "lambda.zip"
+  function_name    = "main-function"
+  role            = aws_iam_role.lambda_role.arn
+  handler         = "index.handler"
+  source_code_hash = filebase64sha256("lambda.zip")
+  runtime         = "python3.9"
+  
+  tags = {
+    Name = "main-lambda"
+  }
+}
+
+resource "aws_iam_role" "lambda_role" {
+  name = "lambda-execution-role"
+  
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Action = "sts:AssumeRole"
+        Effect = "Allow"
+        Principal = {
+          Service = "lambda.amazonaws.com"
+        }
+      }
+    ]
+  })
+}
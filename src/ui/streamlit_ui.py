@@ -1,14 +1,86 @@
 """Streamlit UI関連のユーティリティ"""
 import streamlit as st
 import json
-from typing import Dict, Any, Optional
+import functools
+import time
+from collections import deque
+from itertools import islice
+from typing import Dict, Any, Optional, Iterable
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+# 画面に描画するチャット履歴の上限（超過分は件数のみ表示）
+_MAX_RENDERED_MESSAGES = 50
+# セッションに保持するチャット履歴の上限（超過分は古い順に破棄）
+_MAX_STORED_MESSAGES = 500
+
+_INITIAL_ASSISTANT_MESSAGE = "どのようなAWS構成に関心がありますか？"
+
+# ストリーミング中に応答末尾へ表示するカーソル
+_CURSOR = "▌"
+# ストリーミング表示の更新間隔（文字数・秒のどちらかに達したら描画）
+_STREAM_FLUSH_CHARS = 64
+_STREAM_FLUSH_INTERVAL = 0.05
+
+# セッション状態に値が無いことを示す番兵（Noneと区別するため）
+_MISSING = object()
+# エージェントモード設定のセッションキー（旧キーから新キーへ移行）
+_LEGACY_AGENT_MODE_KEY = "enable_terraform_agent_mode"
+_AGENT_MODE_KEY = "enable_agent_mode"
+# セッションキーの移行表（旧キー -> 新キー）
+_SESSION_KEY_MIGRATIONS = {
+    _LEGACY_AGENT_MODE_KEY: _AGENT_MODE_KEY,
+}
+
+def _new_message_history() -> deque:
+    """上限付きのチャット履歴を作成"""
+    return deque(
+        [{"role": "assistant", "content": _INITIAL_ASSISTANT_MESSAGE}],
+        maxlen=_MAX_STORED_MESSAGES
+    )
+
+def migrate_session_state(session_state) -> bool:
+    """
+    既存設定の移行処理（例: enable_terraform_agent_mode -> enable_agent_mode）
+    
+    _SESSION_KEY_MIGRATIONS の各キーをまとめて移行し、セッション状態はその場で更新する
+    （新しいキーが既にあれば上書きしない）。
+    戻り値は移行の有無のみのため、st.session_state への再代入には使用しないこと。
+    
+    Returns:
+        1つ以上のキーを移行した場合はTrue
+    """
+    # 旧キーは get() の1回の参照で存在確認と値取得を兼ねる
+    new_items = {
+        new_key: old_value
+        for old_key, new_key in _SESSION_KEY_MIGRATIONS.items()
+        if (old_value := session_state.get(old_key, _MISSING)) is not _MISSING
+        and new_key not in session_state
+    }
+    if new_items:
+        session_state.update(new_items)
+    return bool(new_items)
+
+def _latest_assistant_content(messages) -> str:
+    """履歴から最新のAI応答を取得（初期メッセージを含む、見つからない場合は空文字）"""
+    for msg in reversed(messages):
+        if msg["role"] == "assistant":
+            return msg["content"]
+    return ""
 
 def initialize_session_state():
     """セッション状態を初期化"""
     if "messages" not in st.session_state:
-        st.session_state["messages"] = [
-            {"role": "assistant", "content": "どのようなAWS構成に関心がありますか？"}
-        ]
+        st.session_state["messages"] = _new_message_history()
+    
+    if "_last_assistant_content" not in st.session_state:
+        # 既存の履歴（初期メッセージを含む）の最新AI応答から開始する
+        st.session_state["_last_assistant_content"] = _latest_assistant_content(st.session_state["messages"])
     
     if "cache_stats" not in st.session_state:
         st.session_state["cache_stats"] = {
@@ -27,12 +99,28 @@ def display_chat_history(messages=None):
     """チャット履歴を表示"""
     if messages is None:
         messages = st.session_state.messages
+    
+    omitted = len(messages) - _MAX_RENDERED_MESSAGES
+    if omitted > 0:
+        # 長い履歴は直近分のみ描画する（dequeはスライス非対応のため islice を使用）
+        st.info(f"💬 {omitted}件の古いメッセージを省略しています")
+        messages = islice(messages, omitted, None)
+    
     for msg in messages:
         st.chat_message(msg["role"]).write(msg["content"])
 
 def add_message_to_history(role: str, content: str):
     """メッセージを履歴に追加"""
     st.session_state.messages.append({"role": role, "content": content})
+    if role == "assistant":
+        # 最新のAI応答を保持し、履歴を逆順に走査せずに参照できるようにする
+        st.session_state["_last_assistant_content"] = content
+
+@functools.lru_cache(maxsize=256)
+def _format_rate(count: int, total: int) -> str:
+    """件数と総数から表示用の割合文字列を作成"""
+    rate = count * 100.0 / total if total else 0.0
+    return f"{rate:.1f}%"
 
 def display_performance_stats():
     """パフォーマンス統計を表示"""
@@ -45,8 +133,7 @@ def display_performance_stats():
         st.metric("キャッシュヒット数", stats["cache_hits"])
     
     with col2:
-        cache_hit_rate = (stats["cache_hits"] / max(stats["total_requests"], 1)) * 100
-        st.metric("キャッシュヒット率", f"{cache_hit_rate:.1f}%")
+        st.metric("キャッシュヒット率", _format_rate(stats["cache_hits"], stats["total_requests"]))
         st.metric("節約トークン数(推定)", stats["total_tokens_saved"])
 
 def display_langchain_stats():
@@ -59,49 +146,71 @@ def display_langchain_stats():
         with col1:
             st.metric("LangChain総リクエスト", lc_stats["total_requests"])
         with col2:
-            success_rate = (lc_stats["successful_requests"] / max(lc_stats["total_requests"], 1)) * 100
-            st.metric("成功率", f"{success_rate:.1f}%")
+            st.metric("成功率", _format_rate(lc_stats["successful_requests"], lc_stats["total_requests"]))
+
+@functools.lru_cache(maxsize=1)
+def _get_conversation_analyzer():
+    """ConversationAnalyzerを初回利用時に一度だけインポート（利用不可の場合はNone）"""
+    try:
+        from langchain_integration.memory_manager import ConversationAnalyzer
+        return ConversationAnalyzer
+    except ImportError:
+        return None
+
+def _serialize_history(history) -> bytes:
+    """エクスポート用に会話履歴をJSONバイト列へ変換（orjsonが利用可能な場合は高速化）"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(history, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(history, ensure_ascii=False, indent=2).encode("utf-8")
 
 def display_memory_stats(memory_manager):
     """メモリ統計を表示"""
     if memory_manager and memory_manager.is_available():
-        try:
-            from langchain_integration.memory_manager import ConversationAnalyzer
-            
-            st.subheader("💭 会話メモリ統計")
-            conversation_analysis = ConversationAnalyzer.analyze_conversation(
-                memory_manager.get_chat_history()
-            )
-            
-            col1, col2 = st.columns(2)
-            with col1:
-                st.metric("会話ターン数", conversation_analysis.get("total_messages", 0))
-                st.metric("ユーザーメッセージ", conversation_analysis.get("user_message_count", 0))
-            with col2:
-                st.metric("AIメッセージ", conversation_analysis.get("ai_message_count", 0))
-                if conversation_analysis.get("topics"):
-                    st.write("**検出トピック:**", ", ".join(conversation_analysis["topics"][:3]))
-            
-            # メモリ管理ボタン
-            col1, col2 = st.columns(2)
-            with col1:
-                if st.button("会話履歴をクリア"):
-                    memory_manager.clear_history()
-                    st.session_state.messages = [
-                        {"role": "assistant", "content": "どのようなAWS構成に関心がありますか？"}
-                    ]
-                    st.rerun()
-            with col2:
-                if st.button("会話履歴をエクスポート"):
-                    history = memory_manager.export_history()
-                    st.download_button(
-                        "履歴をダウンロード",
-                        data=json.dumps(history, ensure_ascii=False, indent=2),
-                        file_name="chat_history.json",
-                        mime="application/json"
-                    )
-        except ImportError:
+        conversation_analyzer = _get_conversation_analyzer()
+        if conversation_analyzer is None:
             st.info("会話分析機能は利用できません。")
+            return
+        
+        st.subheader("💭 会話メモリ統計")
+        conversation_analysis = conversation_analyzer.analyze_conversation(
+            memory_manager.get_chat_history()
+        )
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("会話ターン数", conversation_analysis.get("total_messages", 0))
+            st.metric("ユーザーメッセージ", conversation_analysis.get("user_message_count", 0))
+        with col2:
+            st.metric("AIメッセージ", conversation_analysis.get("ai_message_count", 0))
+            if conversation_analysis.get("topics"):
+                st.write("**検出トピック:**", ", ".join(conversation_analysis["topics"][:3]))
+        
+        # メモリ管理ボタン
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("会話履歴をクリア"):
+                memory_manager.clear_history()
+                st.session_state.messages = _new_message_history()
+                st.session_state["_last_assistant_content"] = _INITIAL_ASSISTANT_MESSAGE
+                st.rerun()
+        with col2:
+            if st.button("会話履歴をエクスポート"):
+                history = memory_manager.export_history()
+                st.download_button(
+                    "履歴をダウンロード",
+                    data=_serialize_history(history),
+                    file_name="chat_history.json",
+                    mime="application/json"
+                )
+
+@functools.lru_cache(maxsize=1)
+def _langchain_mcp_available() -> bool:
+    """LangChain MCP統合の利用可否（結果はプロセス内で固定のためキャッシュ）"""
+    try:
+        from langchain_integration.mcp_tools import is_langchain_mcp_available
+        return bool(is_langchain_mcp_available())
+    except ImportError:
+        return False
 
 def display_settings_tab(bedrock_service):
     """設定タブを表示"""
@@ -128,13 +237,9 @@ def display_settings_tab(bedrock_service):
             st.write("✅ チャット履歴管理")
             st.write("✅ ストリーミングレスポンス")
             
-            try:
-                from langchain_integration.mcp_tools import is_langchain_mcp_available
-                if is_langchain_mcp_available():
-                    st.write("✅ MCP Tools統合")
-                else:
-                    st.write("❌ MCP Tools統合（パッケージ未インストール）")
-            except ImportError:
+            if _langchain_mcp_available():
+                st.write("✅ MCP Tools統合")
+            else:
                 st.write("❌ MCP Tools統合（パッケージ未インストール）")
     else:
         st.session_state["use_langchain"] = False
@@ -153,6 +258,37 @@ def display_settings_tab(bedrock_service):
         }
         st.rerun()
 
+def stream_to_placeholder(placeholder, chunks: Iterable[str]) -> str:
+    """
+    ストリーミング応答をまとめてプレースホルダーに描画し、全文を返す
+    
+    チャンクごとに描画すると応答が長い場合にフロントエンドへの送信が増えるため、
+    一定の文字数または時間が経過したときだけ表示を更新する。
+    
+    Args:
+        placeholder: st.empty() で作成したプレースホルダー
+        chunks: 応答テキストのチャンク
+        
+    Returns:
+        連結した応答全文
+    """
+    parts = []
+    pending = 0
+    last_flush = time.monotonic()
+    
+    for chunk in chunks:
+        parts.append(chunk)
+        pending += len(chunk)
+        now = time.monotonic()
+        if pending >= _STREAM_FLUSH_CHARS or now - last_flush >= _STREAM_FLUSH_INTERVAL:
+            placeholder.write(f"{''.join(parts)}{_CURSOR}")
+            pending = 0
+            last_flush = now
+    
+    full_response = "".join(parts)
+    placeholder.write(full_response)
+    return full_response
+
 def handle_chat_input(bedrock_service, memory_manager=None):
     """チャット入力を処理"""
     if prompt := st.chat_input():
@@ -168,7 +304,6 @@ def handle_chat_input(bedrock_service, memory_manager=None):
         # AI応答を取得
         with st.chat_message("assistant"):
             with st.spinner("AIが応答を生成中です..."):
-                full_response = ""
                 message_placeholder = st.empty()
                 
                 # 設定値を取得
@@ -176,15 +311,14 @@ def handle_chat_input(bedrock_service, memory_manager=None):
                 use_langchain = st.session_state.get("use_langchain", True)
                 
                 # ストリーミング応答を処理
-                for chunk in bedrock_service.invoke_streaming(
-                    prompt=prompt,
-                    enable_cache=enable_cache,
-                    use_langchain=use_langchain
-                ):
-                    full_response += chunk
-                    message_placeholder.write(full_response + "▌")
-                
-                message_placeholder.write(full_response)
+                full_response = stream_to_placeholder(
+                    message_placeholder,
+                    bedrock_service.invoke_streaming(
+                        prompt=prompt,
+                        enable_cache=enable_cache,
+                        use_langchain=use_langchain
+                    )
+                )
         
         # AI応答を履歴に追加
         add_message_to_history("assistant", full_response)
@@ -11,6 +11,24 @@ from pathlib import Path
 from typing import Dict, Any, Optional
 import logging
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+# プロジェクトルート（開発環境での設定ファイル配置先）
+_PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+
+def _loads_json_bytes(data: bytes) -> Any:
+    """JSONバイト列をパース（orjsonが利用可能な場合は高速パーサーを使用）"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data.decode('utf-8'))
+
 
 class ConfigManager:
     """設定ファイル管理クラス（基本機能のみ）"""
@@ -44,7 +62,7 @@ class ConfigManager:
             return Path('.') / 'config'
         else:
             # 開発環境の場合：プロジェクトルートの config
-            return Path(__file__).parent.parent.parent / 'config'
+            return _PROJECT_ROOT / 'config'
     
     def _get_streamlit_dir(self) -> Path:
         """Streamlit設定ディレクトリのパスを取得"""
@@ -53,7 +71,7 @@ class ConfigManager:
             return Path('.') / '.streamlit'
         else:
             # 開発環境の場合：プロジェクトルートの .streamlit
-            return Path(__file__).parent.parent.parent / '.streamlit'
+            return _PROJECT_ROOT / '.streamlit'
     
     def get_mcp_config_path(self) -> Path:
         """MCP設定ファイルのパスを取得"""
@@ -91,7 +109,7 @@ class ConfigManager:
             default_config = Path('./dist_config/mcp_config.json')
         else:
             # 開発環境：プロジェクトルートからコピー
-            default_config = Path(__file__).parent.parent.parent / 'config' / 'mcp_config.json'
+            default_config = _PROJECT_ROOT / 'config' / 'mcp_config.json'
         
         if default_config.exists():
             self.ensure_config_directories()
@@ -105,22 +123,33 @@ class ConfigManager:
             default_secrets = Path('./dist_config/.streamlit/secrets.toml.example')
         else:
             # 開発環境：プロジェクトルートからコピー
-            default_secrets = Path(__file__).parent.parent.parent / '.streamlit' / 'secrets.toml.example'
+            default_secrets = _PROJECT_ROOT / '.streamlit' / 'secrets.toml.example'
         
         if default_secrets.exists():
             self.ensure_config_directories()
             shutil.copy2(default_secrets, self.get_secrets_example_path())
             self.logger.info(f"デフォルトsecrets.toml.example をコピーしました: {default_secrets}")
     
+    @staticmethod
+    def _list_entry_names(directory: Path) -> frozenset:
+        """ディレクトリ直下のエントリ名を1回の走査で取得（存在しない場合は空）"""
+        try:
+            with os.scandir(directory) as entries:
+                return frozenset(entry.name for entry in entries)
+        except OSError:
+            return frozenset()
+    
     def get_config_status(self) -> Dict[str, Any]:
         """設定ファイルの状態を取得"""
+        config_entries = self._list_entry_names(self.config_dir)
+        streamlit_entries = self._list_entry_names(self.streamlit_dir)
         return {
             "is_desktop_app": self.is_desktop_app,
             "config_dir": str(self.config_dir),
             "streamlit_dir": str(self.streamlit_dir),
-            "mcp_config_exists": self.get_mcp_config_path().exists(),
-            "secrets_exists": self.get_secrets_path().exists(),
-            "secrets_example_exists": self.get_secrets_example_path().exists()
+            "mcp_config_exists": self.get_mcp_config_path().name in config_entries,
+            "secrets_exists": self.get_secrets_path().name in streamlit_entries,
+            "secrets_example_exists": self.get_secrets_example_path().name in streamlit_entries
         }
     
     def load_mcp_config(self) -> Optional[Dict[str, Any]]:
@@ -132,8 +161,7 @@ class ConfigManager:
             return None
         
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return _loads_json_bytes(config_path.read_bytes())
         except Exception as e:
             self.logger.error(f"MCP設定の読み込みエラー: {e}")
             return None
@@ -0,0 +1,14 @@
+"""
+pytest共通設定
+
+テスト対象モジュール（src配下）とプロジェクトルートを一度だけsys.pathに追加します。
+"""
+
+import sys
+from pathlib import Path
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+for _path in (str(_PROJECT_ROOT / "src"), str(_PROJECT_ROOT)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
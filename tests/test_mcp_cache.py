@@ -3,39 +3,41 @@ MCPリクエストキャッシュのテスト
 """
 
 import unittest
-import time
-import sys
+import unittest.mock
 import os
-
-# テスト対象モジュールのパスを追加
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 try:
-    from services.mcp_client import MCPRequestCache
+    from services.mcp_client import MCPRequestCache, _close_disk_shelves
 except ImportError:
     # Streamlit依存関係を回避するため、テストをスキップ
-    MCPRequestCache = None
+    MCPRequestCache = _close_disk_shelves = None
 
+# MCPRequestCacheを読み込めない環境ではクラス単位でスキップ
+_skip_without_cache = unittest.skipUnless(
+    MCPRequestCache is not None, "Streamlit依存関係のため、単体テスト環境では実行できません"
+)
 
+
+@_skip_without_cache
 class TestMCPRequestCache(unittest.TestCase):
     """MCPリクエストキャッシュのテスト"""
 
     def setUp(self):
         """テストセットアップ"""
-        if MCPRequestCache is None:
-            self.skipTest("Streamlit依存関係のため、単体テスト環境では実行できません")
-        
         self.cache = MCPRequestCache(default_ttl=1)  # 1秒のTTLでテスト
         
     def test_cache_key_generation(self):
         """キャッシュキー生成のテスト"""
         # 同じパラメータで同じキーが生成されることを確認
-        key1 = self.cache._generate_cache_key("test_method", "arg1", param="value")
-        key2 = self.cache._generate_cache_key("test_method", "arg1", param="value")
+        key1 = self.cache.make_key("test_method", "arg1", param="value")
+        key2 = self.cache.make_key("test_method", "arg1", param="value")
         self.assertEqual(key1, key2)
         
         # 異なるパラメータで異なるキーが生成されることを確認
-        key3 = self.cache._generate_cache_key("test_method", "arg2", param="value")
+        key3 = self.cache.make_key("test_method", "arg2", param="value")
         self.assertNotEqual(key1, key3)
         
         # キーが文字列であることを確認
@@ -58,6 +60,10 @@ class TestMCPRequestCache(unittest.TestCase):
 
     def test_cache_ttl_expiration(self):
         """TTL期限切れのテスト"""
+        # 実時間を待たずに済むよう時計を差し替える
+        fake_now = [1000.0]
+        self.cache._clock = lambda: fake_now[0]
+        
         # 短いTTLでキャッシュ保存
         test_value = "test_data"
         self.cache.set("test_method", test_value, 0.1, "query")  # 0.1秒TTL
@@ -67,10 +73,22 @@ class TestMCPRequestCache(unittest.TestCase):
         self.assertEqual(result, test_value)
         
         # TTL期限切れ後にアクセス - ミスするはず
-        time.sleep(0.2)
+        fake_now[0] += 0.2
         expired_result = self.cache.get("test_method", "query")
         self.assertIsNone(expired_result)
 
+    def test_cache_hit_does_not_extend_ttl(self):
+        """参照によって有効期限が延長されないことのテスト"""
+        fake_now = [1000.0]
+        self.cache._clock = lambda: fake_now[0]
+        self.cache.set("test_method", "value", 0.1, "query")
+        
+        # 期限内に参照してもTTLは保存時点から数える
+        fake_now[0] += 0.08
+        self.assertEqual(self.cache.get("test_method", "query"), "value")
+        fake_now[0] += 0.04
+        self.assertIsNone(self.cache.get("test_method", "query"))
+
     def test_cache_stats(self):
         """キャッシュ統計のテスト"""
         # 初期統計
@@ -128,25 +146,190 @@ class TestMCPRequestCache(unittest.TestCase):
         self.assertEqual(result2, "value2")
         self.assertNotEqual(result1, result2)
 
+    def test_cache_max_size_eviction(self):
+        """上限超過時に参照されていないエントリが削除されることのテスト"""
+        cache = MCPRequestCache(default_ttl=60, max_size=2)
+        cache.set("test_method", "value_a", None, "a")
+        cache.set("test_method", "value_b", None, "b")
+        
+        # "a" を参照して最近使われた状態にする
+        self.assertEqual(cache.get("test_method", "a"), "value_a")
+        
+        # 3件目の保存で参照回数の少ない "b" が削除される
+        cache.set("test_method", "value_c", None, "c")
+        
+        self.assertIsNone(cache.get("test_method", "b"))
+        self.assertEqual(cache.get("test_method", "a"), "value_a")
+        self.assertEqual(cache.get("test_method", "c"), "value_c")
+        self.assertEqual(cache.get_stats()["cache_size"], 2)
+        self.assertEqual(cache.get_stats()["evictions"], 1)
+
+    def test_cache_lfu_keeps_frequent_entry(self):
+        """最近参照されていなくても参照回数の多いエントリが保持されることのテスト"""
+        cache = MCPRequestCache(default_ttl=60, max_size=2)
+        cache.set("test_method", "value_a", None, "a")
+        cache.set("test_method", "value_b", None, "b")
+        
+        # "a" を複数回参照した後、"b" を1回だけ参照する（LRUなら "a" が削除対象）
+        cache.get("test_method", "a")
+        cache.get("test_method", "a")
+        cache.get("test_method", "b")
+        
+        cache.set("test_method", "value_c", None, "c")
+        
+        self.assertEqual(cache.get("test_method", "a"), "value_a")
+        self.assertIsNone(cache.get("test_method", "b"))
+        self.assertEqual(cache.get("test_method", "c"), "value_c")
+
+    def test_cache_evicts_expired_entries_before_frequent_ones(self):
+        """参照回数が多くても期限切れのエントリが先に削除されることのテスト"""
+        fake_now = [1000.0]
+        cache = MCPRequestCache(default_ttl=60, max_size=4)
+        cache._clock = lambda: fake_now[0]
+        for key in ("a", "b", "c"):
+            cache.set("test_method", f"value_{key}", 1, key)
+            for _ in range(5):
+                cache.get("test_method", key)
+        
+        # a/b/c が期限切れになった後に新しいエントリを追加
+        fake_now[0] += 10
+        for key in ("d", "e", "f", "g"):
+            cache.set("test_method", f"value_{key}", None, key)
+        
+        self.assertEqual(
+            [cache.get("test_method", key) for key in ("d", "e", "f", "g")],
+            ["value_d", "value_e", "value_f", "value_g"]
+        )
+        self.assertEqual(cache.get_stats()["evictions"], 3)
+
+    def test_cache_concurrent_access_during_eviction(self):
+        """複数スレッドから削除を伴う get/set を同時に行っても整合性が保たれることのテスト"""
+        cache = MCPRequestCache(default_ttl=60, max_size=16)
+        
+        # スレッド切り替えを頻繁にして競合を起こりやすくする
+        self.addCleanup(sys.setswitchinterval, sys.getswitchinterval())
+        sys.setswitchinterval(1e-6)
+        
+        def worker(worker_id):
+            for i in range(500):
+                key = (worker_id * 7 + i) % 64
+                if cache.get("test_method", key) is None:
+                    cache.set("test_method", f"value_{key}", None, key)
+                if i % 50 == 0:
+                    cache.cleanup_expired()
+                    cache.get_stats()
+        
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            # result() でワーカー内の例外を再送出させる
+            for future in [executor.submit(worker, n) for n in range(8)]:
+                future.result()
+        
+        stats = cache.get_stats()
+        self.assertLessEqual(stats["cache_entries"], 16)
+        self.assertEqual(stats["hits"] + stats["misses"], stats["total_requests"])
+        self.assertEqual(stats["total_requests"], 8 * 500)
+        self.assertGreater(stats["evictions"], 0)
+
+    def test_cache_hit_counts_decay(self):
+        """過去に多く参照されたエントリも、参照されなくなれば最終的に削除されることのテスト"""
+        cache = MCPRequestCache(default_ttl=60, max_size=2)
+        cache.set("test_method", "value_hot", None, "hot")
+        for _ in range(3):
+            cache.get("test_method", "hot")
+        
+        # 以降 "hot" は参照せず、新しいエントリのみを追加し続ける
+        for i in range(10):
+            cache.set("test_method", f"value_{i}", None, i)
+        
+        self.assertIsNone(cache.get("test_method", "hot"))
+
+
+@_skip_without_cache
+class TestMCPRequestCacheDiskLayer(unittest.TestCase):
+    """MCPリクエストキャッシュのディスク永続化のテスト"""
+
+    def setUp(self):
+        """テストセットアップ"""
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        # 共有されたshelveは一時ディレクトリの削除前に閉じる
+        self.addCleanup(_close_disk_shelves)
+        self.cache_path = os.path.join(temp_dir.name, "mcp", "cache")
+
+    def test_disk_layer_shared_across_instances(self):
+        """別インスタンス（再起動後を想定）からディスク上の値を取得できることのテスト"""
+        writer = MCPRequestCache(default_ttl=60, path=self.cache_path)
+        writer.set("test_method", {"test": "data"}, None, "query")
+        
+        reader = MCPRequestCache(default_ttl=60, path=self.cache_path)
+        self.assertEqual(reader.get("test_method", "query"), {"test": "data"})
+        self.assertEqual(reader.get_stats()["hits"], 1)
+
+    def test_disk_layer_respects_ttl(self):
+        """ディスク上でも期限切れの値は返さないことのテスト"""
+        fake_now = [1000.0]
+        writer = MCPRequestCache(path=self.cache_path)
+        writer._wall_clock = lambda: fake_now[0]
+        writer.set("test_method", "value", 0.1, "query")
+        fake_now[0] += 0.2
+        
+        reader = MCPRequestCache(path=self.cache_path)
+        reader._wall_clock = lambda: fake_now[0]
+        self.assertIsNone(reader.get("test_method", "query"))
 
+    def test_clear_removes_disk_entries(self):
+        """clear() でディスク層もクリアされることのテスト"""
+        cache = MCPRequestCache(default_ttl=60, path=self.cache_path)
+        cache.set("test_method", "value", None, "query")
+        cache.clear()
+        
+        reader = MCPRequestCache(default_ttl=60, path=self.cache_path)
+        self.assertIsNone(reader.get("test_method", "query"))
+
+    def test_unusable_path_falls_back_to_memory(self):
+        """ディスク層のディレクトリを作成できない場合もメモリのみで動作することのテスト"""
+        # 親ディレクトリの位置に通常ファイルを置き、mkdir を失敗させる
+        blocker = os.path.dirname(self.cache_path)
+        open(blocker, "w").close()
+        
+        cache = MCPRequestCache(default_ttl=60, path=self.cache_path)
+        cache.set("test_method", "value", None, "query")
+        
+        self.assertIsNone(cache.path)
+        self.assertEqual(cache.get("test_method", "query"), "value")
+
+
+@_skip_without_cache
 class TestMCPCacheIntegration(unittest.TestCase):
     """MCPキャッシュ統合のテスト"""
 
     def test_cache_parameter_normalization(self):
         """キャッシュパラメータ正規化のテスト"""
-        if MCPRequestCache is None:
-            self.skipTest("Streamlit依存関係のため、単体テスト環境では実行できません")
-            
         cache = MCPRequestCache()
         
         # 同じ辞書パラメータでも順序が異なる場合のテスト
-        key1 = cache._generate_cache_key("test", param1="a", param2="b")
-        key2 = cache._generate_cache_key("test", param2="b", param1="a")
+        key1 = cache.make_key("test", param1="a", param2="b")
+        key2 = cache.make_key("test", param2="b", param1="a")
         
         # 辞書は内部でソートされるため、同じキーになるはず
         self.assertEqual(key1, key2)
 
+    def test_cache_mixed_type_dict_keys(self):
+        """型の混在した辞書キーでもキャッシュの保存・取得ができることのテスト"""
+        cache = MCPRequestCache()
+        setup = {"region": "us-east-1", 1: "first", None: "none"}
+        
+        # orjsonの有無に関わらず標準json経路でも例外にならないことを確認
+        with unittest.mock.patch("services.mcp_client.ORJSON_AVAILABLE", False):
+            key1 = cache.make_key("test", setup)
+            key2 = cache.make_key("test", dict(reversed(list(setup.items()))))
+            cache.set("test", "value", 60, setup)
+            
+            self.assertEqual(key1, key2)
+            self.assertEqual(cache.get("test", setup), "value")
+
 
 if __name__ == '__main__':
-    # テスト実行設定
-    unittest.main(verbosity=2)
\ No newline at end of file
+    # 直接実行時もconftest.py（src のパス設定）を読み込むようpytest経由で実行
+    import pytest
+    sys.exit(pytest.main([__file__, "-v"]))
\ No newline at end of file
@@ -2,30 +2,36 @@
 """MCP統合テストスクリプト"""
 
 import sys
-import os
+import json
 import logging
+from functools import lru_cache
+from pathlib import Path
+
+# プロジェクトルートのMCP設定ファイル
+_MCP_CONFIG_PATH = Path(__file__).resolve().parent.parent / "config" / "mcp_config.json"
+
+
+@lru_cache(maxsize=1)
+def _load_mcp_cfg():
+    """MCP設定ファイルを一度だけ読み込んで共有（存在しない場合はNone）"""
+    if not _MCP_CONFIG_PATH.exists():
+        return None
+    return json.loads(_MCP_CONFIG_PATH.read_bytes())
 
-# プロジェクトルートをパスに追加
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 def test_mcp_config():
     """MCP設定ファイルをテスト"""
     try:
-        import json
-        
         print('=== MCP設定テスト開始 ===')
         
         # MCP設定ファイルを読み込み
-        config_path = os.path.join(os.path.dirname(__file__), 'config', 'mcp_config.json')
-        print(f'設定ファイル: {config_path}')
+        print(f'設定ファイル: {_MCP_CONFIG_PATH}')
+        config = _load_mcp_cfg()
         
-        if not os.path.exists(config_path):
+        if config is None:
             print('エラー: 設定ファイルが見つかりません')
             return False
         
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-        
         # MCPサーバーの確認
         print('\n設定されたMCPサーバー:')
         servers = config.get('mcpServers', {})
@@ -64,18 +70,11 @@ def test_mcp_client_basic():
         # Streamlit依存関係なしでMCPClientServiceをテスト
         print('\n=== 基本MCPクライアントテスト ===')
         
-        # MCPClientServiceクラスをインポート（Streamlit関数を使わない）
-        import json
-        from pathlib import Path
-        
-        # 設定ファイルの存在確認
-        config_path = Path(__file__).parent / "config" / "mcp_config.json"
-        print(f'設定ファイル: {config_path}')
+        # 設定ファイルの存在確認（test_mcp_configと読み込み結果を共有）
+        print(f'設定ファイル: {_MCP_CONFIG_PATH}')
+        config = _load_mcp_cfg()
         
-        if config_path.exists():
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-            
+        if config is not None:
             # Cost Analysis MCP Serverの設定確認
             servers = config.get('mcpServers', {})
             if 'awslabs.cost-analysis-mcp-server' in servers:
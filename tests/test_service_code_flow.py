@@ -3,26 +3,37 @@
 サービスコード変換からMCPサーバー呼び出しまでのフロー検証テスト
 """
 
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import asyncio
+import time
+import pytest
 
 from src.services.aws_service_code_helper import get_service_code_helper
 from src.services.mcp_client import MCPClientService
 import logging
 
-def test_aws_service_code_helper():
+# 検証対象の主要サービスとコスト見積もり構成（モジュール定数として共有）
+_CORE_SERVICES = ("EC2", "S3", "RDS", "Lambda")
+_TEST_CONFIGS = (
+    {'service_name': 'EC2', 'region': 'us-east-1', 'instance_type': 't3.small'},
+    {'service_name': 'S3', 'region': 'us-east-1'},
+    {'service_name': 'RDS', 'region': 'us-east-1', 'instance_type': 'db.t3.small'}
+)
+
+@pytest.fixture(scope="module")
+def mcp_client():
+    """モジュール内のテストで共有するMCPClientService（設定読み込みは1回のみ）"""
+    return MCPClientService()
+
+@pytest.mark.parametrize("service", _CORE_SERVICES)
+def test_aws_service_code_helper(service):
     helper = get_service_code_helper()
     assert helper.service_codes is not None, "Service codes should not be None"
     assert len(helper.service_codes) > 0, "Service codes dictionary should not be empty"
     
-    test_services = ["EC2", "S3", "RDS", "Lambda"]
-    for service in test_services:
-        code = helper.find_service_code(service)
-        assert code is not None, f"Service code for {service} should not be None"
+    code = helper.find_service_code(service)
+    assert code is not None, f"Service code for {service} should not be None"
 
-def test_mcp_client_service():
-    mcp_client = MCPClientService()
+def test_mcp_client_service(mcp_client):
     assert len(mcp_client.config.get("mcpServers", {})) > 0, "MCP servers should not be empty"
     assert len(mcp_client.mcp_tools) > 0, "MCP tools should not be empty"
     
@@ -32,21 +43,49 @@ def test_mcp_client_service():
         assert "connection_status" in status, f"{server} should have a connection_status"
         assert "initialized" in status, f"{server} should have an initialized status"
 
-def test_cost_estimation_flow():
-    mcp_client = MCPClientService()
-    test_configs = [
-        {'service_name': 'EC2', 'region': 'us-east-1', 'instance_type': 't3.small'},
-        {'service_name': 'S3', 'region': 'us-east-1'},
-        {'service_name': 'RDS', 'region': 'us-east-1', 'instance_type': 'db.t3.small'}
-    ]
-    
-    for config in test_configs:
-        cost_result = mcp_client.get_cost_estimation(config)
-        assert cost_result is not None, f"Cost estimation for {config['service_name']} should not fail"
-        assert "cost" in cost_result, "Cost result should include 'cost'"
-        assert "detail" in cost_result, "Cost result should include 'detail'"
-        assert "optimization" in cost_result, "Cost result should include 'optimization'"
-        assert "current_state" in cost_result, "Cost result should include 'current_state'"
+async def _estimate_all(mcp_client, configs):
+    """各構成のコスト見積もりをスレッドで並列に取得"""
+    return await asyncio.gather(
+        *(asyncio.to_thread(mcp_client.get_cost_estimation, config) for config in configs)
+    )
+
+@pytest.mark.parametrize("config", _TEST_CONFIGS, ids=[c['service_name'] for c in _TEST_CONFIGS])
+def test_cost_estimation_flow(mcp_client, config):
+    cost_result = mcp_client.get_cost_estimation(config)
+    assert cost_result is not None, f"Cost estimation for {config['service_name']} should not fail"
+    assert "cost" in cost_result, "Cost result should include 'cost'"
+    assert "detail" in cost_result, "Cost result should include 'detail'"
+    assert "optimization" in cost_result, "Cost result should include 'optimization'"
+    assert "current_state" in cost_result, "Cost result should include 'current_state'"
+
+def test_terraform_code_cached_by_normalized_requirements(mcp_client):
+    mcp_client.request_cache.clear()
+    
+    first = mcp_client.generate_terraform_code("VPC with public subnet")
+    hits_before = mcp_client.request_cache.get_stats()["hits"]
+    second = mcp_client.generate_terraform_code("  vpc with public subnet ")
+    
+    assert "aws_vpc" in first, "VPC requirements should select the VPC template"
+    assert second == first, "Requirements differing only in case/whitespace should share a result"
+    assert mcp_client.request_cache.get_stats()["hits"] == hits_before + 1, "Second call should hit the cache"
+
+def test_concurrent_identical_estimates_share_one_fetch(mcp_client, monkeypatch):
+    calls = []
+    original_fetch = mcp_client._fetch_cost_estimation
+    
+    def counting_fetch(service_config, cache_key_data):
+        calls.append(service_config["service_name"])
+        time.sleep(0.1)  # 同時実行中に後続リクエストが到着するよう待機
+        return original_fetch(service_config, cache_key_data)
+    
+    monkeypatch.setattr(mcp_client, "_fetch_cost_estimation", counting_fetch)
+    mcp_client.request_cache.clear()
+    
+    config = {'service_name': 'Lambda', 'region': 'us-west-2'}
+    results = asyncio.run(_estimate_all(mcp_client, [config] * 3))
+    
+    assert len(calls) == 1, "Identical concurrent estimates should be fetched once"
+    assert all(result == results[0] for result in results), "All callers should receive the same result"
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    pytest.main([__file__, "-v"])
\ No newline at end of file
@@ -2,11 +2,29 @@
 セッション状態キー移行のテスト
 
 enable_terraform_agent_mode から enable_agent_mode への移行ロジックをテストします。
+
+移行要件:
+- 既存ユーザーの設定保持
+- 新規ユーザーのデフォルトTrue
+- 古いキーの保持（互換性）
+- 新しいキーが既存の場合の非上書き
 """
 
 import unittest
 
+try:
+    from ui.streamlit_ui import migrate_session_state
+except ImportError:
+    # Streamlit依存関係を回避するため、テストをスキップ
+    migrate_session_state = None
+
+# streamlit を読み込めない環境ではクラス単位でスキップ
+_skip_without_streamlit = unittest.skipUnless(
+    migrate_session_state is not None, "Streamlit依存関係のため、単体テスト環境では実行できません"
+)
+
 
+@_skip_without_streamlit
 class TestSessionStateMigration(unittest.TestCase):
     """セッション状態移行のテスト"""
 
@@ -17,21 +35,16 @@ class TestSessionStateMigration(unittest.TestCase):
             "enable_terraform_agent_mode": False  # 既存ユーザーがFalseに設定
         }
         
-        # 移行ロジックをシミュレート
-        def migrate_session_state(session_state):
-            if "enable_terraform_agent_mode" in session_state and "enable_agent_mode" not in session_state:
-                session_state["enable_agent_mode"] = session_state["enable_terraform_agent_mode"]
-            return session_state
-        
         # 移行実行
-        result_state = migrate_session_state(mock_session_state)
+        migrated = migrate_session_state(mock_session_state)
         
         # 検証: 古い設定が新しいキーに移行されている
-        self.assertIn("enable_agent_mode", result_state)
-        self.assertEqual(result_state["enable_agent_mode"], False)
+        self.assertTrue(migrated)
+        self.assertIn("enable_agent_mode", mock_session_state)
+        self.assertEqual(mock_session_state["enable_agent_mode"], False)
         
         # 検証: 古いキーは残っている（他の処理で使用される可能性）
-        self.assertIn("enable_terraform_agent_mode", result_state)
+        self.assertIn("enable_terraform_agent_mode", mock_session_state)
 
     def test_migration_logic_when_new_key_already_exists(self):
         """新しいキーが既に存在する場合の移行テスト"""
@@ -41,38 +54,28 @@ class TestSessionStateMigration(unittest.TestCase):
             "enable_agent_mode": True  # 新しい設定が既に存在
         }
         
-        # 移行ロジックをシミュレート
-        def migrate_session_state(session_state):
-            if "enable_terraform_agent_mode" in session_state and "enable_agent_mode" not in session_state:
-                session_state["enable_agent_mode"] = session_state["enable_terraform_agent_mode"]
-            return session_state
-        
         # 移行実行
-        result_state = migrate_session_state(mock_session_state)
+        migrated = migrate_session_state(mock_session_state)
         
         # 検証: 新しいキーの値は変更されない
-        self.assertEqual(result_state["enable_agent_mode"], True)
+        self.assertFalse(migrated)
+        self.assertEqual(mock_session_state["enable_agent_mode"], True)
         
         # 検証: 古いキーの値も保持されている
-        self.assertEqual(result_state["enable_terraform_agent_mode"], False)
+        self.assertEqual(mock_session_state["enable_terraform_agent_mode"], False)
 
     def test_migration_logic_when_old_key_missing(self):
         """古いキーが存在しない場合の移行テスト"""
         # モックセッション状態を作成（新規ユーザー）
         mock_session_state = {}
         
-        # 移行ロジックをシミュレート
-        def migrate_session_state(session_state):
-            if "enable_terraform_agent_mode" in session_state and "enable_agent_mode" not in session_state:
-                session_state["enable_agent_mode"] = session_state["enable_terraform_agent_mode"]
-            return session_state
-        
         # 移行実行
-        result_state = migrate_session_state(mock_session_state)
+        migrated = migrate_session_state(mock_session_state)
         
         # 検証: 何も変更されない
-        self.assertNotIn("enable_agent_mode", result_state)
-        self.assertNotIn("enable_terraform_agent_mode", result_state)
+        self.assertFalse(migrated)
+        self.assertNotIn("enable_agent_mode", mock_session_state)
+        self.assertNotIn("enable_terraform_agent_mode", mock_session_state)
 
     def test_migration_preserves_user_preference_false(self):
         """ユーザーがFalseに設定していた場合の設定保持テスト"""
@@ -81,17 +84,10 @@ class TestSessionStateMigration(unittest.TestCase):
             "enable_terraform_agent_mode": False
         }
         
-        # 移行ロジック + デフォルト値取得をシミュレート
-        def get_migrated_value(session_state, default=True):
-            # 移行処理
-            if "enable_terraform_agent_mode" in session_state and "enable_agent_mode" not in session_state:
-                session_state["enable_agent_mode"] = session_state["enable_terraform_agent_mode"]
-            
-            # 値取得（Streamlitのget相当）
-            return session_state.get("enable_agent_mode", default)
-        
         # 実行
-        result_value = get_migrated_value(mock_session_state, True)
+        migrate_session_state(mock_session_state)
+        # 値取得はページ側と同じく get() のデフォルトTrueで行う
+        result_value = mock_session_state.get("enable_agent_mode", True)
         
         # 検証: ユーザーのFalse設定が保持される（デフォルトのTrueにならない）
         self.assertEqual(result_value, False)
@@ -103,17 +99,10 @@ class TestSessionStateMigration(unittest.TestCase):
             "enable_terraform_agent_mode": True
         }
         
-        # 移行ロジック + デフォルト値取得をシミュレート
-        def get_migrated_value(session_state, default=True):
-            # 移行処理
-            if "enable_terraform_agent_mode" in session_state and "enable_agent_mode" not in session_state:
-                session_state["enable_agent_mode"] = session_state["enable_terraform_agent_mode"]
-            
-            # 値取得（Streamlitのget相当）
-            return session_state.get("enable_agent_mode", default)
-        
         # 実行
-        result_value = get_migrated_value(mock_session_state, True)
+        migrate_session_state(mock_session_state)
+        # 値取得はページ側と同じく get() のデフォルトTrueで行う
+        result_value = mock_session_state.get("enable_agent_mode", True)
         
         # 検証: ユーザーのTrue設定が保持される
         self.assertEqual(result_value, True)
@@ -123,42 +112,48 @@ class TestSessionStateMigration(unittest.TestCase):
         # 新規ユーザー（何も設定なし）
         mock_session_state = {}
         
-        # 移行ロジック + デフォルト値取得をシミュレート
-        def get_migrated_value(session_state, default=True):
-            # 移行処理
-            if "enable_terraform_agent_mode" in session_state and "enable_agent_mode" not in session_state:
-                session_state["enable_agent_mode"] = session_state["enable_terraform_agent_mode"]
-            
-            # 値取得（Streamlitのget相当）
-            return session_state.get("enable_agent_mode", default)
-        
         # 実行
-        result_value = get_migrated_value(mock_session_state, True)
+        migrate_session_state(mock_session_state)
+        # 値取得はページ側と同じく get() のデフォルトTrueで行う
+        result_value = mock_session_state.get("enable_agent_mode", True)
         
         # 検証: 新規ユーザーはデフォルトのTrueを取得
         self.assertEqual(result_value, True)
 
 
-class TestMigrationRequirements(unittest.TestCase):
-    """移行要件のテスト"""
+@_skip_without_streamlit
+class TestMigrateSessionStateFunction(unittest.TestCase):
+    """streamlit_ui.migrate_session_state のテスト"""
 
-    def test_migration_requirements_coverage(self):
-        """移行要件がカバーされていることを確認"""
-        # 移行要件のチェックリスト
-        requirements = [
-            "既存ユーザーの設定保持",
-            "新規ユーザーのデフォルトTrue",
-            "古いキーの保持（互換性）",
-            "新しいキーが既存の場合の非上書き"
-        ]
+    def test_migration_mutates_session_state_in_place(self):
+        """移行が新しい辞書を作らず、渡されたセッション状態をその場で更新することのテスト"""
+        messages = []
+        session_state = {
+            "enable_terraform_agent_mode": False,
+            "messages": messages
+        }
+        session_state_ref = session_state
+        
+        migrated = migrate_session_state(session_state)
         
-        for requirement in requirements:
-            with self.subTest(requirement=requirement):
-                # 各要件が文字列として定義されていることを確認
-                self.assertIsInstance(requirement, str)
-                self.assertGreater(len(requirement), 0)
+        # 検証: 戻り値は移行有無のフラグのみで、呼び出し前の参照から更新結果が見える
+        self.assertIs(migrated, True)
+        self.assertEqual(session_state_ref["enable_agent_mode"], False)
+        self.assertEqual(set(session_state_ref), {"enable_terraform_agent_mode", "enable_agent_mode", "messages"})
+        self.assertIs(session_state_ref["messages"], messages)
+
+    def test_migration_returns_false_without_changes(self):
+        """移行不要の場合はFalseを返し、セッション状態を変更しないことのテスト"""
+        for session_state in ({}, {"enable_terraform_agent_mode": False, "enable_agent_mode": True}):
+            with self.subTest(session_state=session_state):
+                expected = dict(session_state)
+                
+                self.assertIs(migrate_session_state(session_state), False)
+                self.assertEqual(session_state, expected)
 
 
 if __name__ == '__main__':
-    # テスト実行設定
-    unittest.main(verbosity=2)
\ No newline at end of file
+    # 直接実行時もconftest.py（src のパス設定）を読み込むようpytest経由で実行
+    import sys
+    import pytest
+    sys.exit(pytest.main([__file__, "-v"]))
\ No newline at end of file
@@ -3,13 +3,19 @@
 サービスコード変換の基本機能テスト（Streamlit依存なし）
 """
 
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-
 import logging
+from itertools import islice
 from src.services.aws_service_code_helper import get_service_code_helper
 
+# 変換結果を確認する重要なサービス（サービス名, 期待するサービスコード）
+_CRITICAL = (
+    ("EC2", "AmazonEC2"),
+    ("S3", "AmazonS3"),
+    ("RDS", "AmazonRDS"),
+    ("Lambda", "AWSLambda"),
+    ("DynamoDB", "AmazonDynamoDB")
+)
+
 def test_service_code_helper():
     """AWSServiceCodeHelperの基本機能テスト"""
     print('=== AWSServiceCodeHelper テスト ===')
@@ -29,7 +35,7 @@ def test_service_code_helper():
             print(f'   ✅ 辞書サイズ: {len(helper.service_codes)}')
             
             # 最初の5つのサービスコードを表示
-            sample_items = list(helper.service_codes.items())[:5]
+            sample_items = list(islice(helper.service_codes.items(), 5))
             print('   サンプルサービスコード:')
             for name, code in sample_items:
                 print(f'     {name} -> {code}')
@@ -44,12 +50,11 @@ def test_service_code_helper():
             "ec2", "s3", "amazon ec2", "aws lambda"
         ]
         
-        successful_conversions = 0
-        for service in test_services:
-            code = helper.find_service_code(service)
+        codes = [helper.find_service_code(service) for service in test_services]
+        successful_conversions = sum(map(bool, codes))
+        for service, code in zip(test_services, codes):
             if code:
                 print(f'   ✅ {service} -> {code}')
-                successful_conversions += 1
             else:
                 print(f'   ❌ {service} -> 見つからず')
         
@@ -59,7 +64,7 @@ def test_service_code_helper():
         print('4. サービス検索テスト...')
         search_results = helper.search_services("ec2")
         print(f'   "ec2"の検索結果: {len(search_results)}件')
-        for result in search_results[:3]:  # 最初の3件を表示
+        for result in islice(search_results, 3):  # 最初の3件を表示
             print(f'     {result["service_name"]} ({result["service_code"]})')
         
         return True
@@ -74,19 +79,11 @@ def test_service_code_mapping():
     """特定のサービスコードマッピングをテスト"""
     print('\n=== サービスコードマッピング詳細テスト ===')
     
-    # 重要なサービスの変換確認
-    critical_services = {
-        "EC2": "AmazonEC2",
-        "S3": "AmazonS3", 
-        "RDS": "AmazonRDS",
-        "Lambda": "AWSLambda",
-        "DynamoDB": "AmazonDynamoDB"
-    }
-    
     helper = get_service_code_helper()
     all_correct = True
     
-    for service_name, expected_code in critical_services.items():
+    # 重要なサービスの変換確認
+    for service_name, expected_code in _CRITICAL:
         actual_code = helper.find_service_code(service_name)
         if actual_code == expected_code:
             print(f'   ✅ {service_name}: {actual_code} (正解)')